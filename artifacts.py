@@ -0,0 +1,169 @@
+# artifacts.py
+# Precomputed, pre-sorted JSON views of the journal for the website, so a
+# page view fetches a small cacheable file instead of the raw CSV:
+#
+#   data/artifacts/latest.json          last LATEST_N rows, newest last
+#   data/artifacts/series/<col>.json    one column's full history
+#   data/artifacts/manifest.json        sha256 / size of every artifact + a
+#                                       content hash over all of them
+#
+# Files whose content did not change are not rewritten. The daily run calls
+# update() with the rows it just wrote: latest.json is re-derived from its
+# previous content and only the series those rows changed are re-encoded, so
+# the journal is not re-read. The manifest records the journal digests it was
+# built from; when they do not match the journal as it was before the run (a
+# repair script rewrote it, the columns changed) everything is rebuilt. The
+# CDN compresses on the fly, so no .gz copies are kept. Full rebuild by hand:
+#
+#   python artifacts.py
+import hashlib, json, time
+from pathlib import Path
+
+import instruments
+import journal
+
+ARTIFACT_DIR = Path("data/artifacts")
+LATEST_N = 60
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), allow_nan=False).encode()
+
+def _meta(cols) -> dict:
+    precision = instruments.precision()
+    return {"columns": cols, "precision": [precision.get(c, 4) for c in cols]}
+
+def _series_name(col: str) -> str:
+    return f"series/{instruments.slug(col)}.json"
+
+def _series(col: str, points) -> bytes:
+    """points: [(date, value)] in date order, values not None."""
+    return _encode({
+        "column": col, "precision": instruments.precision().get(col, 4),
+        "dates": [d for d, _ in points], "values": [v for _, v in points],
+    })
+
+def _append_series(data: bytes, points, first: str):
+    """data (an encoded series) with points appended, when every written row
+    (first = the earliest) is dated after the series' last date - the daily
+    case: only the new points are encoded and spliced in. None when that
+    does not apply."""
+    head, sep, tail = data.partition(b'],"values":[')
+    if not sep or not tail.endswith(b"]}") or not head.endswith(b'"'):
+        return None  # not the expected layout, or an empty series
+    last = head[-11:-1].decode()
+    if first <= last:
+        return None
+    dates = b"".join(b"," + _encode(d) for d, _ in points)
+    values = b"".join(b"," + _encode(v) for _, v in points)
+    return head + dates + sep + tail[:-2] + values + b"]}"
+
+def read_manifest(out_dir: Path = ARTIFACT_DIR) -> dict:
+    try:
+        with open(out_dir / "manifest.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _publish(files: dict, cols, last_date, out_dir: Path, old: dict) -> dict:
+    """Write the changed files and the manifest (entries for files not in
+    files are kept from old)."""
+    written = 0
+    entries = dict(old.get("files", {}))
+    for name, data in files.items():
+        written += journal.write_if_changed(out_dir / name, data)
+        entries[name] = {"sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data)}
+    content_hash = hashlib.sha256(
+        "".join(f"{n}:{e['sha256']}\n" for n, e in sorted(entries.items())).encode()
+    ).hexdigest()
+    digests = journal.digests()
+    if old.get("hash") == content_hash and old.get("journal") == digests:
+        print(f"[artifacts] unchanged ({content_hash[:12]})")
+        return old
+    manifest = {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "hash": content_hash,
+        "last_date": last_date,
+        "latest": "latest.json",
+        "series": {c: _series_name(c) for c in cols},
+        "files": entries,
+        "journal": digests,
+    }
+    journal.write_if_changed(out_dir / "manifest.json", (json.dumps(manifest, indent=2) + "\n").encode())
+    print(f"[artifacts] wrote {written} file(s) to {out_dir} ({content_hash[:12]})")
+    return manifest
+
+def build(rows=None, headers=None, out_dir: Path = ARTIFACT_DIR, latest_n: int = LATEST_N) -> dict:
+    """Build every artifact from the journal (or the given rows); returns the manifest."""
+    headers = headers or journal.read_header()
+    rows = journal.load_rows() if rows is None else rows
+    rows = sorted((r for r in rows if (r.get("date") or "").strip()), key=lambda r: r["date"])
+    cols = headers[1:]
+
+    files = {}
+    latest = {**_meta(cols), "rows": [[r["date"]] + [journal.cell_value(r.get(c)) for c in cols] for r in rows[-latest_n:]]}
+    files["latest.json"] = _encode(latest)
+    for c in cols:
+        points = [(r["date"], journal.cell_value(r.get(c))) for r in rows]
+        files[_series_name(c)] = _series(c, [(d, v) for d, v in points if v is not None])
+    old = read_manifest(out_dir)
+    old.pop("files", None)  # full rebuild: drop entries of columns no longer present
+    return _publish(files, cols, rows[-1]["date"] if rows else None, out_dir, old)
+
+def update(written, before=None, headers=None, out_dir: Path = ARTIFACT_DIR,
+           latest_n: int = LATEST_N) -> dict:
+    """Fold just-written journal rows into the artifacts: latest.json plus the
+    series of the columns whose values those rows changed; the journal is not
+    re-read. before is journal.digests() taken ahead of the caller's writes;
+    when it does not match what the manifest was built from (or the columns /
+    precision changed) this is a full build(). Returns the manifest."""
+    headers = headers or journal.read_header()
+    cols = headers[1:]
+    meta = _meta(cols)
+    old = read_manifest(out_dir)
+    try:
+        latest = json.loads((out_dir / "latest.json").read_bytes())
+    except (OSError, ValueError):
+        latest = None
+    expected = {"latest.json"} | {_series_name(c) for c in cols}
+    if (before is None or old.get("journal") != before or latest is None
+            or {k: latest.get(k) for k in meta} != meta or set(old.get("files", {})) != expected):
+        return build(headers=headers, out_dir=out_dir, latest_n=latest_n)
+
+    by_date = {}
+    for r in written:
+        if (r.get("date") or "").strip():
+            by_date[r["date"]] = [journal.cell_value(r.get(c)) for c in cols]
+    window = {row[0]: row[1:] for row in latest["rows"]}
+    first = latest["rows"][0][0] if latest["rows"] else None
+    touched = set()
+    for dstr, values in by_date.items():
+        before_values = window.get(dstr)
+        for c, v, was in zip(cols, values, before_values or [None] * len(cols)):
+            # a row older than the window may have cleared a value we cannot see
+            if v != was or (before_values is None and first is not None and dstr < first):
+                touched.add(c)
+
+    window.update(by_date)
+    files = {"latest.json": _encode({**meta, "rows": [[d] + window[d] for d in sorted(window)[-latest_n:]]})}
+    for j, c in enumerate(cols):
+        if c not in touched:
+            continue
+        data = (out_dir / _series_name(c)).read_bytes()
+        new = [(d, by_date[d][j]) for d in sorted(by_date) if by_date[d][j] is not None]
+        appended = _append_series(data, new, min(by_date))
+        if appended is not None:
+            files[_series_name(c)] = appended
+            continue
+        series = json.loads(data)
+        points = dict(zip(series["dates"], series["values"]))
+        for dstr, values in by_date.items():
+            if values[j] is None:
+                points.pop(dstr, None)
+            else:
+                points[dstr] = values[j]
+        files[_series_name(c)] = _series(c, [(d, points[d]) for d in sorted(points)])
+    last_date = max([old.get("last_date") or "", *by_date])
+    return _publish(files, cols, last_date or None, out_dir, old)
+
+if __name__ == "__main__":
+    build()
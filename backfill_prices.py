@@ -1,154 +1,236 @@
 # backfill_prices.py
-import os, csv
+# Backfill the journal over a date range.
+#
+# The range is cut into chunks of CHUNK_DAYS business days x batches of Yahoo
+# tickers; the chunks are downloaded on a process pool (--workers, default one
+# per core) with at most --window chunks in flight or waiting, so memory stays
+# bounded however long the range. Finished chunks are merged into the journal
+# strictly in date order (one rewrite per chunk; only the months touched when
+# the journal is partitioned), so the result does not depend on which worker
+# finishes first. FRED series are one request each and are fetched up front.
+#
+# Progress goes to a checkpoint journal (checkpoint.py): every fetched chunk
+# and every merged date chunk is recorded, so re-running the same command
+# after a crash skips merged chunks and reuses fetched ones.
+#
+#   python backfill_prices.py [START END] [--workers N] [--chunk-days N] [--window N] [--restart]
+import argparse, os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta, date
-from pathlib import Path
-import yfinance as yf
-
-# --- FRED fallback for non-US 10Y ---
-FRED_KEY = os.getenv("FRED_API_KEY")
-fred = None
-if FRED_KEY:
-    try:
-        from fredapi import Fred
-        fred = Fred(api_key=FRED_KEY)
-    except Exception:
-        fred = None
-
-CSV_PATH = Path("data/etf_prices_log.csv")
-
-DATES = [
-    "2025-09-05","2025-09-08","2025-09-09","2025-09-10",
-    "2025-09-11","2025-09-12","2025-09-15","2025-09-16",
-]
-
-HEADERS = [
-    "date","EURO/USD","STG/USD","USD/YEN","NIKKEI","DAX","FTSE","DOW","S&P",
-    "JAPAN 10 YR (%)","GERMAN 10 YR (%)","UK 10 YR (%)","US 10 YR (%)",
-    "GOLD","BRENT CRUDE","BITCOIN"
-]
-
-# Yahoo Finance tickers
-YF_TICKERS = {
-    "EURO/USD": "EURUSD=X",
-    "STG/USD": "GBPUSD=X",
-    "USD/YEN": "JPY=X",          # USD/JPY
-    "NIKKEI": "^N225",
-    "DAX": "^GDAXI",
-    "FTSE": "^FTSE",
-    "DOW": "^DJI",
-    "S&P": "^GSPC",
-    "GOLD": "GC=F",
-    "BRENT CRUDE": "BZ=F",
-    "BITCOIN": "BTC-USD",
-    # US 10Y via Yahoo ^TNX (tenths of a percent; divide by 10)
-    "US 10 YR (%)": "^TNX",
-}
-
-# FRED fallback (monthly OECD series) for JP/DE/UK 10Y
-FRED_SERIES = {
-    "GERMAN 10 YR (%)": "IRLTLT01DEM156N",
-    "UK 10 YR (%)":     "IRLTLT01GBM156N",
-    "JAPAN 10 YR (%)":  "IRLTLT01JPM156N",
-}
+import pandas as pd
 
-def iso(s): return datetime.strptime(s, "%Y-%m-%d").date()
+import fred_cache
+import instruments
+import journal
+from checkpoint import Checkpoint
+from fetch_prices import download_closes, download_chunk
 
-def get_close_yf(ticker: str, d: date):
-    """Daily close on date d. Use 2-day window and take last row (handles TZ)."""
-    try:
-        df = yf.Ticker(ticker).history(
-            start=d, end=d + timedelta(days=2),
-            interval="1d", auto_adjust=False
-        )
-        if not df.empty:
-            return float(df["Close"].iloc[-1])
-    except Exception:
-        pass
-    return None
-
-def get_us10y_from_yahoo(d: date):
-    """US 10Y from Yahoo ^TNX (reported in tenths of a percent)."""
-    v = get_close_yf("^TNX", d)
-    if v is None:
-        return None
-    return v  # <-- FIX: convert to percent
-
-def fred_latest_leq(series_id: str, d: date):
-    """Most recent FRED value on/before d (handles monthly series). Returns float or None."""
-    if not fred:
-        return None
-    try:
-        start = d - timedelta(days=90)  # cover month boundaries
-        s = fred.get_series(series_id, observation_start=start, observation_end=d)
-        if s is not None:
-            s = s.dropna()
-            if len(s) > 0:
-                return float(s.iloc[-1])
-    except Exception:
-        pass
-    return None
+CSV_PATH = journal.CSV_PATH
 
-def ensure_header():
-    CSV_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not CSV_PATH.exists():
-        with open(CSV_PATH, "w", newline="") as f:
-            csv.writer(f).writerow(HEADERS)
-
-def load_rows():
-    if not CSV_PATH.exists(): return []
-    with open(CSV_PATH, newline="") as f:
-        return list(csv.DictReader(f))
-
-def write_rows(headers, rows):
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
-
-def main():
-    ensure_header()
-    rows = load_rows()
-    have = {r["date"] for r in rows if r.get("date")}
-    new_rows = []
+# Default range when no start/end is given on the command line
+START_DATE = "2025-09-05"
+END_DATE = "2025-09-16"
+
+# Days of history fetched before the range start so the first business
+# days can carry forward across holidays / month boundaries
+YF_LOOKBACK_DAYS = 10
+FRED_LOOKBACK_DAYS = 90
+
+# Business days per chunk and tickers per chunk (one grouped download each)
+CHUNK_DAYS = 63
+CHUNK_TICKERS = instruments.fetch_settings()["batch_size"]
+
+# Columns and sources come from the instrument registry (instruments.json);
+# FRED fills the FRED-sourced yields (monthly OECD series, carried forward)
+HEADERS = instruments.headers()
+YF_TICKERS = instruments.yahoo_tickers()
+FRED_SERIES = instruments.fred_series(primary_only=True)
+PRECISION = instruments.precision()
+SCALE = instruments.scale()
 
-    for dstr in DATES:
-        d = iso(dstr)
-        row = next((r for r in rows if r.get("date") == dstr), None)
+def iso(s): return datetime.strptime(s, "%Y-%m-%d").date()
+
+def ensure_header():
+    journal.ensure_header(HEADERS)
+
+def fetch_range_yf(start: date, end: date, index: pd.DatetimeIndex, columns=None) -> pd.DataFrame:
+    """Closes for the YF_TICKERS columns (all, or just columns) over [start, end],
+    downloaded once per ticker and aligned (as-of / carry-forward) to the
+    journal's dates."""
+    tickers = {name: t for name, t in YF_TICKERS.items() if columns is None or name in columns}
+    lo, hi = start - timedelta(days=YF_LOOKBACK_DAYS), end + timedelta(days=1)
+    if columns is None:
+        closes = download_closes(tickers.values(), lo, hi)
+    else:
+        closes = download_chunk(list(dict.fromkeys(tickers.values())), lo, hi)
+    cols = {name: t for name, t in tickers.items() if t in closes}
+    if not cols:
+        return pd.DataFrame(index=index)
+    closes.index = pd.to_datetime(closes.index)
+    frame = closes[list(cols.values())].set_axis(list(cols.keys()), axis=1)
+    return frame.sort_index().ffill().reindex(index, method="ffill")
+
+def fetch_range_fred(start: date, end: date, index: pd.DatetimeIndex) -> pd.DataFrame:
+    """FRED_SERIES over [start, end], one request per series, aligned as-of to index."""
+    out = pd.DataFrame(index=index)
+    for name, sid in FRED_SERIES.items():
+        try:
+            obs = fred_cache.observations(sid, start - timedelta(days=FRED_LOOKBACK_DAYS), end)
+        except Exception as e:
+            print(f"[warn] FRED fetch failed for {sid}: {e}")
+            continue
+        if obs:
+            dates, values = zip(*obs)
+            s = pd.Series(values, index=pd.to_datetime(dates))
+            out[name] = s.reindex(index, method="ffill")
+    return out
+
+# ====== Chunks ======
+def plan(d0: date, d1: date, chunk_days: int = CHUNK_DAYS, chunk_tickers: int = CHUNK_TICKERS):
+    """(date chunks, column groups): business-day ranges [(start, end)] and
+    lists of Yahoo columns, each group one grouped download."""
+    days = pd.bdate_range(d0, d1)
+    spans = [(days[i].date(), days[min(i + chunk_days, len(days)) - 1].date())
+             for i in range(0, len(days), chunk_days)]
+    cols = list(YF_TICKERS)
+    groups = [cols[i:i + chunk_tickers] for i in range(0, len(cols), chunk_tickers)]
+    return spans, groups
+
+def fetch_chunk(task):
+    """Worker: formatted closes {date: {column: cell}} for one (date chunk,
+    column group). Runs in a pool process, so it returns plain dicts."""
+    ci, gi, start, end, columns = task
+    index = pd.bdate_range(start, end)
+    prices = fetch_range_yf(start, end, index, columns)
+    cells = {}
+    for name in prices.columns:
+        for ts, v in prices[name].items():
+            if pd.notna(v):
+                cells.setdefault(ts.strftime("%Y-%m-%d"), {})[name] = f"{v * SCALE[name]:.{PRECISION[name]}f}"
+    return ci, gi, cells
+
+def _fetch_key(ci, gi):
+    return f"fetch:{ci}:{gi}"
+
+def _merged_key(ci):
+    return f"merged:{ci}"
+
+def run_chunks(tasks, workers: int, window: int, ckpt: Checkpoint, fetch=fetch_chunk):
+    """Yield (ci, [cells per group]) for each date chunk not yet merged, in
+    date order. Fetched groups are recorded in ckpt as they arrive; groups
+    recorded by an earlier run are not fetched again and are read back from
+    ckpt only when their chunk is merged. At most window fetched groups are
+    in flight or held in memory waiting for their chunk's turn."""
+    n_groups = 1 + max(t[1] for t in tasks)
+    chunks = sorted({t[0] for t in tasks if _merged_key(t[0]) not in ckpt})
+    todo = [t for t in tasks if t[0] in set(chunks) and _fetch_key(t[0], t[1]) not in ckpt]
+    held = {ci: {} for ci in chunks}  # fetched by this run, not merged yet
+
+    def collect(result):
+        ci, gi, cells = result
+        ckpt.record(_fetch_key(ci, gi), cells)
+        held[ci][gi] = cells
+
+    def ready(ci):
+        return all(_fetch_key(ci, gi) in ckpt for gi in range(n_groups))
+
+    def groups(ci):
+        mine = held.pop(ci)
+        return [mine[gi] if gi in mine else ckpt.get(_fetch_key(ci, gi)) for gi in range(n_groups)]
+
+    if workers <= 1:
+        for ci in chunks:
+            for t in todo:
+                if t[0] == ci:
+                    collect(fetch(t))
+            yield ci, groups(ci)
+        return
+
+    # todo is in chunk order, so the chunk being waited on is always the
+    # first with unsubmitted work and a whole chunk always fits the window
+    window = max(window, n_groups)
+    pending, nxt = set(), 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for ci in chunks:
+            while not ready(ci):
+                buffered = sum(len(v) for v in held.values())
+                while nxt < len(todo) and len(pending) + buffered < window:
+                    pending.add(pool.submit(fetch, todo[nxt]))
+                    nxt += 1
+                if not pending:
+                    raise RuntimeError(f"chunk {ci} has unfetched groups but nothing to wait on")
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    collect(fut.result())
+            yield ci, groups(ci)
+
+def merge_chunk(start: date, end: date, groups, yields: pd.DataFrame):
+    """Journal rows for [start, end]: existing rows updated with the chunk's
+    prices (and FRED yields where the cell is empty). Returns (rows, added)."""
+    s, e = start.isoformat(), end.isoformat()
+    by_date = {r["date"]: r for r in journal.load_range(s, e)}
+    rows, added = [], 0
+    for ts in pd.bdate_range(start, end):
+        dstr = ts.strftime("%Y-%m-%d")
+        row = by_date.get(dstr)
         if row is None:
             row = {h: "" for h in HEADERS}
             row["date"] = dstr
-
-        # Prices via Yahoo (FX/indices/commodities/BTC)
-        for name, t in YF_TICKERS.items():
-            if name == "US 10 YR (%)":
-                v = get_us10y_from_yahoo(d)
-            else:
-                v = get_close_yf(t, d)
-            if v is not None:
-                row[name] = f"{v:.4f}"
-
+            added += 1
+        # Prices via Yahoo (FX/indices/commodities/BTC/US 10Y), groups in fixed order
+        for cells in groups:
+            row.update(cells.get(dstr, {}))
         # JP/DE/UK 10Y via FRED carry-forward
-        for name, sid in FRED_SERIES.items():
-            if not row.get(name):
-                v = fred_latest_leq(sid, d)
-                if v is not None:
-                    row[name] = f"{v:.4f}"
-
-        if dstr in have:
-            # update existing row in place
-            for i, r in enumerate(rows):
-                if r.get("date") == dstr:
-                    rows[i] = row
-                    break
-            print(f"[update] {dstr}")
-        else:
-            new_rows.append([row[h] for h in HEADERS])
-            rows.append(row)
-            print(f"[add] {dstr}")
-
-    # Rewrite entire CSV to ensure consistent 4dp formatting
-    write_rows(HEADERS, rows)
-    print(f"[done] wrote CSV with {len(rows)} total rows (added {len(new_rows)})")
+        for name in yields.columns:
+            v = yields.at[ts, name]
+            if not row.get(name) and pd.notna(v):
+                row[name] = f"{v:.{PRECISION[name]}f}"
+        rows.append(row)
+    return rows, added
+
+def main(start: str = START_DATE, end: str = END_DATE, workers: int | None = None,
+         chunk_days: int = CHUNK_DAYS, window: int | None = None, resume: bool = True):
+    ensure_header()
+    d0, d1 = iso(start), iso(end)
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+
+    yields = fetch_range_fred(d0, d1, pd.bdate_range(d0, d1))
+    spans, groups = plan(d0, d1, chunk_days)
+    if not spans:
+        print(f"[done] no business days in {start}..{end}")
+        return
+    tasks = [(ci, gi, s, e, cols) for ci, (s, e) in enumerate(spans) for gi, cols in enumerate(groups)]
+    print(f"[plan] {len(spans)} date chunk(s) x {len(groups)} column group(s) on {workers} worker(s)")
+
+    params = {"start": start, "end": end, "chunk_days": chunk_days, "groups": groups}
+    total_added = total_rows = 0
+    with Checkpoint("backfill_prices", params, resume=resume) as ckpt:
+        for ci, cells in run_chunks(tasks, workers, window, ckpt):
+            s, e = spans[ci]
+            rows, added = merge_chunk(s, e, cells, yields)
+            wrote = journal.upsert_rows(HEADERS, rows)
+            ckpt.record(_merged_key(ci))
+            total_added += added
+            total_rows += len(rows)
+            print(f"[chunk {ci + 1}/{len(spans)}] {s}..{e}: {len(rows)} row(s), {added} added"
+                  f"{'' if wrote else ' (unchanged)'}")
+    print(f"[done] merged {total_rows} row(s) (added {total_added})")
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Backfill the journal over a date range.")
+    p.add_argument("start", nargs="?", default=START_DATE)
+    p.add_argument("end", nargs="?", default=END_DATE)
+    p.add_argument("--workers", type=int, default=None, help="Processes (default: one per core; 1 = serial).")
+    p.add_argument("--chunk-days", type=int, default=CHUNK_DAYS, help="Business days per chunk.")
+    p.add_argument("--window", type=int, default=None,
+                   help="Chunks in flight or waiting to merge (default: 2 x workers).")
+    p.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over.")
+    return p.parse_args()
 
 if __name__ == "__main__":
-    main()
+    # usage: python backfill_prices.py [START END] [--workers N]  (YYYY-MM-DD, inclusive)
+    import instrumentation
+    args = parse_args()
+    with instrumentation.session("backfill_prices"):
+        main(args.start, args.end, args.workers, args.chunk_days, args.window, resume=not args.restart)
@@ -1,50 +1,38 @@
 # backfill_yields_after_917.py
 # Backfill JAPAN, GERMAN, UK 10 YR (%) values for all dates after 2025-09-17
-import os, csv
+#
+# Each FRED series is fetched once for the whole range (and checkpointed);
+# rows are then filled and written a chunk at a time, each finished chunk
+# (with the carry-forward values at its end) going to the checkpoint journal
+# (checkpoint.py), so a re-run after a crash resumes after the last chunk.
+#   python backfill_yields_after_917.py [--restart]
 from datetime import datetime, timedelta, date
-from pathlib import Path
 
-FRED_KEY = os.getenv("FRED_API_KEY")
-fred = None
-if FRED_KEY:
-    try:
-        from fredapi import Fred
-        fred = Fred(api_key=FRED_KEY)
-        print(f"[ok] FRED API initialized")
-    except Exception as e:
-        print(f"[warn] FRED API not available: {e}")
-        fred = None
-else:
+from fred_cache import FRED_KEY
+import fred_cache
+import instruments
+import journal
+from checkpoint import Checkpoint
+
+if not FRED_KEY:
     print("[warn] FRED_API_KEY not set, will use carry-forward only")
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+CSV_PATH = journal.CSV_PATH
 
-FRED_SERIES = {
-    "GERMAN 10 YR (%)": "IRLTLT01DEM156N",
-    "UK 10 YR (%)":     "IRLTLT01GBM156N",
-    "JAPAN 10 YR (%)":  "IRLTLT01JPM156N",
-}
+# FRED-sourced yield columns from the instrument registry
+FRED_SERIES = instruments.fred_series(primary_only=True)
 
 TARGET_COLS = list(FRED_SERIES.keys())
 
+# Rows filled (and checkpointed) per chunk
+CHUNK_ROWS = 100
+
+# Oldest FRED observation still used for a row (covers monthly series)
+LOOKBACK_DAYS = 90
+
 def iso(s: str) -> date:
     return datetime.strptime(s.strip(), "%Y-%m-%d").date()
 
-def fred_latest_leq(series_id: str, d: date):
-    """Most recent FRED value on/before d (handles monthly series). Returns float or None."""
-    if not fred:
-        return None
-    try:
-        start = d - timedelta(days=90)  # cover month boundaries
-        s = fred.get_series(series_id, observation_start=start, observation_end=d)
-        if s is not None:
-            s = s.dropna()
-            if len(s) > 0:
-                return float(s.iloc[-1])
-    except Exception as e:
-        print(f"[warn] FRED lookup failed for {series_id} on {d}: {e}")
-    return None
-
 def parse_float(s: str) -> float | None:
     """Parse a float from string, return None if empty/invalid."""
     if not s or not s.strip():
@@ -54,16 +42,14 @@ def parse_float(s: str) -> float | None:
     except ValueError:
         return None
 
-def main():
-    if not CSV_PATH.exists():
+def main(resume: bool = True):
+    if not journal.files():
         print(f"[error] CSV not found: {CSV_PATH}")
         return
 
     # Load all rows
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames
-        rows = list(reader)
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     if not headers:
         print("[error] No headers found")
@@ -96,70 +82,105 @@ def main():
     for col in TARGET_COLS:
         print(f"  {col}: {last_known[col]}")
 
-    # Second pass: fill missing values for dates after cutoff
-    changed = 0
+    # Second pass: fill missing values for dates after cutoff, a chunk at a time
+    targets = []
     for row in rows:
         dstr = row.get("date", "").strip()
-        if not dstr:
-            continue
         try:
-            d = iso(dstr)
-            if d <= cutoff_date:
-                continue  # Skip dates on/before cutoff
-
-            # Check if any of the target columns are missing
-            needs_update = False
-            for col in TARGET_COLS:
-                val = parse_float(row.get(col, ""))
-                if val is None:
-                    needs_update = True
-                    break
-
-            if not needs_update:
-                continue  # All values already present
-
-            # Try to get FRED values, fallback to carry-forward
-            for col in TARGET_COLS:
-                current_val = parse_float(row.get(col, ""))
-                if current_val is not None:
-                    # Already has value, update last_known and skip
-                    last_known[col] = current_val
-                    continue
-
-                # Try FRED first
-                series_id = FRED_SERIES[col]
-                fred_val = fred_latest_leq(series_id, d)
-                
-                if fred_val is not None:
-                    # Use FRED value
-                    row[col] = f"{fred_val:.4f}"
-                    last_known[col] = fred_val
-                    changed += 1
-                    print(f"[fill] {dstr} {col} -> {fred_val:.4f} (FRED)")
-                elif last_known[col] is not None:
-                    # Carry forward last known value
-                    row[col] = f"{last_known[col]:.4f}"
-                    changed += 1
-                    print(f"[fill] {dstr} {col} -> {last_known[col]:.4f} (carry-forward)")
-                else:
-                    print(f"[warn] {dstr} {col} -> no value available (no FRED, no last known)")
-
-        except Exception as e:
-            print(f"[error] Processing row {dstr}: {e}")
+            if dstr and iso(dstr) > cutoff_date:
+                targets.append(row)
+        except ValueError:
             continue
+    targets.sort(key=lambda r: r["date"])
+
+    changed = 0
+    params = {"cutoff": cutoff_str, "series": FRED_SERIES, "rows": len(targets)}
+    with Checkpoint("backfill_yields_after_917", params, resume=resume) as ckpt:
+        # one request per series covering every target row
+        needed = any(parse_float(r.get(col, "")) is None for r in targets for col in TARGET_COLS)
+        if needed and FRED_KEY:
+            indexes = fred_cache.SeriesIndex.fetch_many(
+                FRED_SERIES.values(), iso(targets[0]["date"]) - timedelta(days=LOOKBACK_DAYS),
+                iso(targets[-1]["date"]), ckpt=ckpt,
+            )
+        else:
+            indexes = {sid: fred_cache.SeriesIndex(sid, []) for sid in FRED_SERIES.values()}
+        for i in range(0, len(targets), CHUNK_ROWS):
+            chunk = targets[i:i + CHUNK_ROWS]
+            key = f"rows:{chunk[0]['date']}..{chunk[-1]['date']}"
+            if key in ckpt:
+                done = ckpt.get(key)
+                changed += done["changed"]
+                last_known = done["last_known"]
+                continue
+            n = sum(fill_row(row, cutoff_date, last_known, indexes) for row in chunk)
+            if n:
+                journal.upsert_rows(headers, chunk)
+            ckpt.record(key, {"changed": n, "last_known": last_known})
+            changed += n
 
     if changed == 0:
         print("[info] No changes needed (all values already present or unavailable)")
         return
 
-    # Write back
-    with open(CSV_PATH, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
-
     print(f"[done] Updated CSV with {changed} filled values")
+    print(f"[cache] FRED {fred_cache.summary()}")
+
+def fill_row(row, cutoff_date: date, last_known: dict, indexes: dict) -> int:
+    """Fill the row's missing target columns (FRED via the pre-fetched
+    {series_id: SeriesIndex}, else carry-forward), updating last_known in
+    place; returns cells filled."""
+    changed = 0
+    dstr = row.get("date", "").strip()
+    try:
+        d = iso(dstr)
+        if d <= cutoff_date:
+            return 0  # Skip dates on/before cutoff
+
+        # Check if any of the target columns are missing
+        needs_update = False
+        for col in TARGET_COLS:
+            val = parse_float(row.get(col, ""))
+            if val is None:
+                needs_update = True
+                break
+
+        if not needs_update:
+            return 0  # All values already present
+
+        # Try to get FRED values, fallback to carry-forward
+        for col in TARGET_COLS:
+            current_val = parse_float(row.get(col, ""))
+            if current_val is not None:
+                # Already has value, update last_known and skip
+                last_known[col] = current_val
+                continue
+
+            # Try FRED first
+            series_id = FRED_SERIES[col]
+            fred_val = indexes[series_id].latest_leq(d, max_age_days=LOOKBACK_DAYS)
+
+            if fred_val is not None:
+                # Use FRED value
+                row[col] = f"{fred_val:.4f}"
+                last_known[col] = fred_val
+                changed += 1
+                print(f"[fill] {dstr} {col} -> {fred_val:.4f} (FRED)")
+            elif last_known[col] is not None:
+                # Carry forward last known value
+                row[col] = f"{last_known[col]:.4f}"
+                changed += 1
+                print(f"[fill] {dstr} {col} -> {last_known[col]:.4f} (carry-forward)")
+            else:
+                print(f"[warn] {dstr} {col} -> no value available (no FRED, no last known)")
+
+    except Exception as e:
+        print(f"[error] Processing row {dstr}: {e}")
+    return changed
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    import sys
+    with instrumentation.session("backfill_yields_after_917"):
+        main(resume="--restart" not in sys.argv[1:])
 
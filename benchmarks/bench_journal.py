@@ -0,0 +1,226 @@
+# benchmarks/bench_journal.py
+# Offline benchmarks for the journal pipeline on synthetic histories.
+#
+# Generates journals with the real HEADERS schema (1k / 100k / 1M rows by
+# default), stubs every provider call (Yahoo, FRED) with synthetic data and
+# times the data-layer helpers, the fetch_prices.main upsert and each repair
+# script end to end. fetch_prices.main is timed twice: against derived tables
+# and artifacts already in step with the journal (the daily path), and from a
+# data/ holding only the CSV (every derived view rebuilt). Results are
+# written as JSON for tracking regressions:
+#
+#   python benchmarks/bench_journal.py
+#   python benchmarks/bench_journal.py --sizes 1000 10000 --only load_rows --repeat 5
+#   python benchmarks/bench_journal.py --out bench.json
+import argparse, contextlib, csv, io, json, os, platform, shutil, sys, tempfile, time
+from datetime import date, timedelta
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+os.environ.setdefault("FRED_API_KEY", "bench")   # scripts that exit without a key
+os.environ.setdefault("FRED_CACHE_DIR", tempfile.mkdtemp(prefix="bench-fred-"))
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import derived
+import fred_cache
+import journal
+import fetch_prices
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_OUT = REPO / "benchmarks" / "results.json"
+CSV_REL = Path("data/etf_prices_log.csv")
+
+# ====== Synthetic data ======
+def synthetic_dates(n: int, end: date = date(2025, 9, 16)):
+    return pd.bdate_range(end=end, periods=n).strftime("%Y-%m-%d")
+
+def generate_journal(path: Path, n: int, seed: int = 0, missing: float = 0.02):
+    """Random-walk journal of n business days; a small share of cells left empty."""
+    rng = np.random.default_rng(seed)
+    cols = fetch_prices.HEADERS[1:]
+    start = rng.uniform(1, 50_000, size=len(cols))
+    walk = start * np.exp(np.cumsum(rng.normal(0, 0.01, size=(n, len(cols))), axis=0))
+    cells = np.char.mod("%.4f", walk).astype(object)
+    cells[rng.random((n, len(cols))) < missing] = ""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(fetch_prices.HEADERS)
+        for d, row in zip(synthetic_dates(n), cells):
+            w.writerow([d, *row])
+
+def _fake_obs(series_id, start=None, end=None, verify=True):
+    """Month-start observations covering [start, end] (or the last two years)."""
+    end = date.fromisoformat(fred_cache._iso(end)) if end else date(2025, 9, 16)
+    start = date.fromisoformat(fred_cache._iso(start)) if start else end - timedelta(days=730)
+    months = pd.date_range(start, end, freq="MS")
+    return [(m.strftime("%Y-%m-%d"), 2.0 + (i % 12) / 10) for i, m in enumerate(months)]
+
+def _fake_closes(tickers, start, end):
+    idx = [ts.date() for ts in pd.bdate_range(start, end - timedelta(days=1))]
+    return pd.DataFrame({t: np.linspace(100, 101, len(idx)) for t in tickers}, index=idx)
+
+def stub_providers():
+    fred_cache.FRED_KEY = "bench"
+    fred_cache.observations = _fake_obs
+    fred_cache.observations_many = lambda specs, verify=True: [_fake_obs(*s) for s in specs]
+    fred_cache.fred_latest_leq = lambda sid, d, lookback_days=90, verify=True: _fake_obs(
+        sid, d - timedelta(days=lookback_days), d)[-1][1]
+    fetch_prices.download_closes = _fake_closes
+
+# ====== Cases ======
+def _script(module_name: str, argv=()):
+    """Run a repair script's main() with the given argv."""
+    def run(rows):
+        module = __import__(module_name)
+        old = sys.argv
+        sys.argv = [module_name + ".py", *argv]
+        try:
+            module.main()
+        finally:
+            sys.argv = old
+    return run
+
+def _load_rows(rows):
+    journal.load_rows()
+
+def _write_rows(rows):
+    journal.write_rows(fetch_prices.HEADERS, rows)
+
+def get_last_known_value(rows, col_name: str, before_date: date):
+    """The old carry-forward lookup: scan every row for the last value before
+    before_date (baseline for the journal's last-valid-value index)."""
+    last_val = None
+    for r in rows:
+        dstr = r.get("date", "").strip()
+        if not dstr or date.fromisoformat(dstr) >= before_date:
+            continue
+        try:
+            last_val = float(r.get(col_name, "").strip())
+        except ValueError:
+            pass
+    return last_val
+
+def _last_known_scan(rows):
+    for col in fetch_prices.FRED_SERIES:
+        get_last_known_value(rows, col, date(2100, 1, 1))
+
+def _last_known_index(rows):
+    for col in fetch_prices.FRED_SERIES:
+        journal.last_known_value(col, date(2100, 1, 1))
+
+def _fetch_main(rows):
+    last = journal.read_last_row()
+    nxt = pd.Timestamp(last["date"]) + pd.offsets.BDay(1)
+    fetch_prices.main(nxt.strftime("%Y-%m-%d"))
+
+# untimed setup; its result is passed to the case
+def _parsed_rows():
+    return journal.load_rows()
+
+def _warm_index():
+    journal.load_last_index()
+
+def _warm_views():
+    """Index, derived table and artifacts in step with the journal, as the
+    previous daily run leaves them."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        journal.load_last_index()
+        derived.rebuild()
+        artifacts.build()
+
+# name -> (callable(setup result), setup or None)
+CASES = {
+    "load_rows":                  (_load_rows, None),
+    "write_rows":                 (_write_rows, _parsed_rows),
+    "get_last_known_value":       (_last_known_scan, _parsed_rows),
+    "last_known_value_index":     (_last_known_index, _warm_index),
+    "fetch_prices.main":          (_fetch_main, _warm_views),
+    "fetch_prices.main_cold":     (_fetch_main, _warm_index),
+    "fix_missing_nikkei":         (_script("fix_missing_nikkei"), None),
+    "backfill_yields_after_917":  (_script("backfill_yields_after_917"), None),
+    "fill_missing_yields":        (_script("fill_missing_yields"), None),
+    "repair_yields":              (_script("repair_yields"), None),
+    "reformat_yields":            (_script("reformat_yields"), None),
+    "fix_old_rows":               (_script("fix_old_rows"), None),
+    "update_yields_from_fred":    (_script("update_yields_from_fred"), None),
+    "fix_yields_fred":            (_script("fix_yields_fred"), None),
+    "repair_journal":             (_script("repair_journal"), None),
+}
+
+def time_case(name, fn, setup, master: Path, workdir: Path, repeat: int):
+    """Best-of-repeat wall time; each run starts from a fresh copy of the journal."""
+    best = None
+    for _ in range(repeat):
+        shutil.rmtree(workdir / "data", ignore_errors=True)
+        (workdir / "data").mkdir()
+        shutil.copyfile(master, workdir / CSV_REL)
+        rows = setup() if setup else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn(rows)
+            elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(sizes, only=None, repeat: int = 1):
+    stub_providers()
+    results = []
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-journal-") as tmp:
+        tmp = Path(tmp)
+        workdir = tmp / "work"
+        workdir.mkdir()
+        os.chdir(workdir)  # scripts resolve data/etf_prices_log.csv relative to cwd
+        try:
+            for n in sizes:
+                master = tmp / f"journal-{n}.csv"
+                generate_journal(master, n)
+                size = master.stat().st_size
+                for name, (fn, setup) in CASES.items():
+                    if only and name not in only:
+                        continue
+                    try:
+                        secs = time_case(name, fn, setup, master, workdir, repeat)
+                        status = "ok"
+                    except (Exception, SystemExit) as e:
+                        secs, status = None, f"error: {e!r}"
+                    results.append({
+                        "case": name, "rows": n, "csv_bytes": size,
+                        "seconds": secs, "status": status,
+                    })
+                    shown = "-" if secs is None else f"{secs:.4f}s"
+                    print(f"[bench] {name:28s} rows={n:>9,} {shown:>10s} {status if status != 'ok' else ''}")
+        finally:
+            os.chdir(old_cwd)
+    return results
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the journal pipeline offline.")
+    p.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    p.add_argument("--only", nargs="+", choices=list(CASES), help="Cases to run (default: all).")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per case; best time is kept.")
+    p.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    results = run(args.sizes, only=args.only, repeat=args.repeat)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[done] wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
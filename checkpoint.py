@@ -0,0 +1,117 @@
+# checkpoint.py
+# Checkpoint journal for long-running jobs (backfills, FRED repairs), so a
+# crash or provider outage part-way through does not throw away the work
+# already done.
+#
+#   .cache/checkpoints/<job>-<params hash>.jsonl
+#       {"key": "...", "data": ...}     one line per completed unit of work
+#
+# A job records each finished unit (a fetched chunk, a merged chunk, a
+# fetched series) as one appended, fsynced JSON line. Re-running the same
+# job with the same parameters loads the file and skips every recorded key;
+# a torn last line from a crash is cut off. Only each key's position in the
+# file is kept in memory - get() reads the unit's data back from disk - so
+# a resume holds no more than a fresh run would. The file is deleted when
+# the job finishes cleanly, so the next run with those parameters starts fresh.
+#
+#   python checkpoint.py            # list checkpoints left by unfinished jobs
+#   python checkpoint.py clear      # delete them
+import hashlib, json, os
+from pathlib import Path
+
+CHECKPOINT_DIR = Path(os.getenv("CHECKPOINT_DIR", ".cache/checkpoints"))
+
+def _params_hash(params: dict) -> str:
+    blob = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha1(blob).hexdigest()[:12]
+
+class Checkpoint:
+    """Append-only record of a job's completed units, keyed by string."""
+
+    def __init__(self, job: str, params: dict | None = None, root: Path = CHECKPOINT_DIR,
+                 resume: bool = True):
+        self.job = job
+        self.path = root / f"{job}-{_params_hash(params or {})}.jsonl"
+        self.offsets = {}  # key -> (offset, length) of its line in the file
+        if not resume:
+            self.path.unlink(missing_ok=True)
+        elif self.path.exists():
+            with open(self.path, "rb") as f:
+                pos = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # a torn write from the crash point
+                    try:
+                        self.offsets[json.loads(line)["key"]] = (pos, len(line))
+                    except (ValueError, KeyError):
+                        pass
+                    pos += len(line)
+            if pos < self.path.stat().st_size:
+                os.truncate(self.path, pos)
+            if self.offsets:
+                print(f"[checkpoint] resuming {job}: {len(self.offsets)} unit(s) already done ({self.path})")
+        self._f = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get(self, key: str, default=None):
+        """A recorded unit's data, read back from the file."""
+        if key not in self.offsets:
+            return default
+        offset, length = self.offsets[key]
+        if self._f is not None:
+            self._f.flush()
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length)).get("data")
+
+    def record(self, key: str, data=None):
+        """Persist one completed unit (durable once this returns)."""
+        if self._f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, "ab")
+        line = (json.dumps({"key": key, "data": data}, separators=(",", ":")) + "\n").encode()
+        offset = self._f.seek(0, os.SEEK_END)
+        self._f.write(line)
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self.offsets[key] = (offset, len(line))
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def finish(self):
+        """The job completed: drop the checkpoint."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.close()
+            print(f"[checkpoint] {self.job} stopped after {len(self.offsets)} unit(s); "
+                  f"re-run with the same arguments to resume")
+
+if __name__ == "__main__":
+    import sys
+    files = sorted(CHECKPOINT_DIR.glob("*.jsonl")) if CHECKPOINT_DIR.exists() else []
+    if len(sys.argv) > 1 and sys.argv[1] == "clear":
+        for p in files:
+            p.unlink()
+        print(f"[checkpoint] removed {len(files)} file(s)")
+    else:
+        for p in files:
+            with open(p) as f:
+                n = sum(1 for _ in f)
+            print(f"{p.name:48s} {n} unit(s)")
+        print(f"[ok] {len(files)} unfinished job(s)")
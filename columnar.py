@@ -0,0 +1,173 @@
+# columnar.py
+# Columnar binary copy of the journal: a datetime64[D] date index plus one
+# float64 .npy file per column, described by a small manifest.
+#
+#   python columnar.py build             # journal -> data/columnar/
+#   python columnar.py export OUT.csv    # data/columnar/ -> CSV (for the site)
+#   python columnar.py info
+#
+# The store is a local cache of the journal (not committed): the manifest
+# records the sha256 of every journal file it was built from, and load()
+# rebuilds it first when the journal has changed since. Reads are
+# memory-mapped and only touch the columns asked for (movers --all-history
+# scores the full history from here). A repair that only changes some
+# columns (repair_yields adding / filling the yield columns) calls
+# update_columns(), which writes just those columns' files and the manifest.
+import csv, json, os
+from pathlib import Path
+import numpy as np
+
+import instruments
+import journal
+
+STORE_DIR = Path("data/columnar")
+MANIFEST = "manifest.json"
+DATE_FILE = "date.npy"
+
+def _to_float(s) -> float:
+    v = journal.cell_value(s)
+    return np.nan if v is None else v
+
+def _save_array(path: Path, arr: np.ndarray):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+def read_manifest(store: Path = STORE_DIR) -> dict:
+    with open(store / MANIFEST) as f:
+        return json.load(f)
+
+def _write_manifest(manifest: dict, store: Path):
+    journal.atomic_write(store / MANIFEST, json.dumps(manifest, indent=2).encode())
+
+def fresh(store: Path = STORE_DIR) -> bool:
+    """True when the store exists and was built from the journal as it is now."""
+    try:
+        return read_manifest(store).get("journal") == journal.digests()
+    except (OSError, ValueError):
+        return False
+
+def build(csv_path: Path | None = None, store: Path = STORE_DIR) -> dict:
+    """(Re)build the store from the CSV (default: the journal, single file or
+    partitions) in one pass."""
+    paths = [csv_path] if csv_path else journal.files()
+    headers = journal.read_header(csv_path)
+    width = len(headers)
+    cells = []
+    for path in paths:
+        journal.recover(path)
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            pos = {h: i for i, h in enumerate(next(reader, []))}
+            take = [pos.get(h) for h in headers]
+            for r in reader:
+                if r and r[0].strip():
+                    cells.append([r[i] if i is not None and i < len(r) else "" for i in take])
+    store.mkdir(parents=True, exist_ok=True)
+    cols = list(zip(*cells)) if cells else [()] * width
+
+    dates = np.array([d.strip() for d in cols[0]], dtype="datetime64[D]")
+    _save_array(store / DATE_FILE, dates)
+    columns = {}
+    for name, values in zip(headers[1:], cols[1:]):
+        fname = instruments.slug(name) + ".npy"
+        _save_array(store / fname, np.array([_to_float(v) for v in values], dtype=np.float64))
+        columns[name] = fname
+    manifest = {"rows": len(dates), "date": DATE_FILE, "columns": columns,
+                "journal": journal.digests(paths)}
+    _write_manifest(manifest, store)
+    return manifest
+
+def sync(store: Path = STORE_DIR) -> bool:
+    """Rebuild the store if the journal changed since it was built; True if rebuilt."""
+    if fresh(store):
+        return False
+    m = build(store=store)
+    print(f"[columnar] rebuilt {store}: {m['rows']} rows x {len(m['columns'])} columns")
+    return True
+
+def load(columns=None, store: Path = STORE_DIR, mmap: bool = True, sync_first: bool = True):
+    """(dates, {column: array}) for the requested columns (all if None).
+    Arrays are read-only memory maps unless mmap=False. The store is brought
+    up to date with the journal first unless sync_first=False."""
+    if sync_first:
+        sync(store)
+    manifest = read_manifest(store)
+    mode = "r" if mmap else None
+    dates = np.load(store / manifest["date"], mmap_mode=mode)
+    names = manifest["columns"] if columns is None else columns
+    data = {}
+    for name in names:
+        if name not in manifest["columns"]:
+            raise KeyError(f"column not in store: {name}")
+        data[name] = np.load(store / manifest["columns"][name], mmap_mode=mode)
+    return dates, data
+
+def add_column(name: str, values, store: Path = STORE_DIR):
+    """Add (or replace) one column; only its .npy file and the manifest are written."""
+    manifest = read_manifest(store)
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.shape != (manifest["rows"],):
+        raise ValueError(f"{name}: expected {manifest['rows']} values, got {arr.shape}")
+    fname = manifest["columns"].get(name) or instruments.slug(name) + ".npy"
+    _save_array(store / fname, arr)
+    manifest["columns"][name] = fname
+    _write_manifest(manifest, store)
+
+def update_columns(headers, rows, names, before: dict, store: Path = STORE_DIR) -> str:
+    """Bring the store up to date after a journal write that changed only the
+    cells of names (columns added or filled in place). before is
+    journal.digests() from ahead of the write. Only those columns are
+    rewritten when the store matched the journal before the write and the
+    dates are the same; otherwise it is rebuilt. No-op without a store.
+    Returns "updated", "rebuilt" or "absent"."""
+    if not (store / MANIFEST).exists():
+        return "absent"
+    manifest = read_manifest(store)
+    rows = sorted((r for r in rows if (r.get("date") or "").strip()), key=lambda r: r["date"])
+    dates = np.array([r["date"].strip() for r in rows], dtype="datetime64[D]")
+    if (manifest.get("journal") != before or len(dates) != manifest["rows"]
+            or not np.array_equal(np.load(store / manifest["date"]), dates)):
+        build(store=store)
+        return "rebuilt"
+    for name in names:
+        add_column(name, [_to_float(r.get(name)) for r in rows], store)
+    manifest = read_manifest(store)
+    manifest["columns"] = {h: manifest["columns"][h] for h in headers[1:] if h in manifest["columns"]}
+    manifest["journal"] = journal.digests()
+    _write_manifest(manifest, store)
+    return "updated"
+
+def export_csv(out_path: Path, store: Path = STORE_DIR):
+    """Write the store out as a journal-format CSV at out_path (NaN -> empty
+    cell, each column at its instrument's precision)."""
+    dates, data = load(store=store)
+    names = list(data)
+    precision = instruments.precision()
+    fmts = [f"{{:.{precision.get(n, 4)}f}}" for n in names]
+    rows = []
+    for i, d in enumerate(dates.astype(str)):
+        row = {"date": d}
+        for n, fmt in zip(names, fmts):
+            v = data[n][i]
+            row[n] = "" if np.isnan(v) else fmt.format(v)
+        rows.append(row)
+    journal.write_rows(["date"] + names, rows, out_path)
+
+if __name__ == "__main__":
+    import sys
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if cmd == "build":
+        m = build()
+        print(f"[done] {STORE_DIR}: {m['rows']} rows x {len(m['columns'])} columns")
+    elif cmd == "export":
+        if len(sys.argv) < 3:
+            sys.exit("usage: python columnar.py export OUT.csv")
+        out = Path(sys.argv[2])
+        export_csv(out)
+        print(f"[done] exported {STORE_DIR} -> {out}")
+    else:
+        m = read_manifest()
+        state = "up to date" if fresh() else "stale (rebuilt on next load)"
+        print(f"[info] {STORE_DIR}: {m['rows']} rows, {state}, columns: {', '.join(m['columns'])}")
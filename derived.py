@@ -0,0 +1,250 @@
+# derived.py
+# Derived analytics table: daily return, 20/50/200-day moving averages and
+# 20-day rolling volatility for every journal column.
+#
+#   data/derived/derived.csv    date, "<col> RET", "<col> MA20", ..., "<col> VOL20"
+#   data/derived/state.json     running window state after the last row
+#
+# Each column keeps its window state (ring buffer of recent closes with a
+# running sum per MA window, ring buffer of returns with running sum / sum of
+# squares), so a new journal row updates the table in O(1) per column.
+# A full rebuild computes the same metrics column-wise with pandas (rolling
+# mean / std over each column's valid closes) and seeds the state from the
+# trailing window of each column.
+# Re-running the same date replays it from the state saved before that date.
+# The state also records a digest of each journal file as of the last derive;
+# if the journal changed some other way since (a repair script rewrote older
+# cells, a row landed before the last one, the columns changed) the table is
+# recomputed from scratch instead.
+#
+#   python derived.py rebuild
+#   python derived.py show [DATE]
+import csv, io, json, math
+from collections import deque
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+import journal
+
+DERIVED_DIR = Path("data/derived")
+TABLE_PATH = DERIVED_DIR / "derived.csv"
+STATE_PATH = DERIVED_DIR / "state.json"
+
+MA_WINDOWS = (20, 50, 200)
+VOL_WINDOW = 20
+TRADING_DAYS = 252  # annualizes the daily return stdev
+
+def metric_names(col: str):
+    return [f"{col} RET"] + [f"{col} MA{w}" for w in MA_WINDOWS] + [f"{col} VOL{VOL_WINDOW}"]
+
+def table_headers(columns):
+    return ["date"] + [m for c in columns for m in metric_names(c)]
+
+class ColumnState:
+    """Running window state for one column."""
+
+    def __init__(self, last=None, prices=(), sums=None, rets=(), ret_sum=0.0, ret_sumsq=0.0):
+        self.last = last
+        self.prices = deque(prices, maxlen=max(MA_WINDOWS))
+        self.sums = dict(sums or {w: 0.0 for w in MA_WINDOWS})
+        self.rets = deque(rets, maxlen=VOL_WINDOW)
+        self.ret_sum, self.ret_sumsq = ret_sum, ret_sumsq
+
+    def push(self, v: float) -> list:
+        """Fold one close in; returns [ret, ma20, ma50, ma200, vol] (None where undefined)."""
+        ret = v / self.last - 1.0 if self.last else None
+        self.last = v
+
+        n = len(self.prices)
+        for w in MA_WINDOWS:
+            self.sums[w] += v
+            if n >= w:
+                self.sums[w] -= self.prices[-w]  # value leaving this window
+        self.prices.append(v)
+        n += 1
+        mas = [self.sums[w] / w if n >= w else None for w in MA_WINDOWS]
+
+        vol = None
+        if ret is not None:
+            if len(self.rets) == VOL_WINDOW:
+                old = self.rets[0]
+                self.ret_sum -= old
+                self.ret_sumsq -= old * old
+            self.rets.append(ret)
+            self.ret_sum += ret
+            self.ret_sumsq += ret * ret
+            k = len(self.rets)
+            if k == VOL_WINDOW:
+                var = (self.ret_sumsq - self.ret_sum * self.ret_sum / k) / (k - 1)
+                vol = math.sqrt(max(var, 0.0) * TRADING_DAYS)
+        return [ret] + mas + [vol]
+
+    def to_dict(self):
+        return {"last": self.last, "prices": list(self.prices), "sums": dict(self.sums),
+                "rets": list(self.rets), "ret_sum": self.ret_sum, "ret_sumsq": self.ret_sumsq}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["last"], d["prices"], {int(w): s for w, s in d["sums"].items()},
+                   d["rets"], d["ret_sum"], d["ret_sumsq"])
+
+def _fmt(v, dp):
+    return "" if v is None else f"{v:.{dp}f}"
+
+def apply_row(states: dict, row: dict, columns, precision: dict) -> dict:
+    """Advance states by one journal row; returns the derived table row."""
+    out = {"date": row["date"]}
+    for col in columns:
+        v = journal.cell_value(row.get(col))
+        if v is None:
+            continue  # no close today: leave metrics empty, windows untouched
+        st = states.setdefault(col, ColumnState())
+        ret, *mas, vol = st.push(v)
+        names = metric_names(col)
+        out[names[0]] = _fmt(ret, 6)
+        for name, ma in zip(names[1:-1], mas):
+            out[name] = _fmt(ma, precision.get(col, 4))
+        out[names[-1]] = _fmt(vol, 6)
+    return out
+
+# ====== State persistence ======
+def _dump_states(states: dict) -> dict:
+    return {c: s.to_dict() for c, s in states.items()}
+
+def _load_states(d: dict) -> dict:
+    return {c: ColumnState.from_dict(s) for c, s in d.items()}
+
+def load_state():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_state(state: dict):
+    """Persist state (skipped when identical to what is on disk)."""
+    DERIVED_DIR.mkdir(parents=True, exist_ok=True)
+    state["journal"] = journal.digests()
+    journal.write_if_changed(STATE_PATH, json.dumps(state).encode())
+
+# ====== Entry points ======
+def _precision():
+    import instruments
+    return instruments.precision()
+
+def _returns(closes: np.ndarray) -> np.ndarray:
+    """Return at each close, as push() computes it (NaN for the first close
+    and after a zero close)."""
+    ret = np.full(len(closes), np.nan)
+    prev, cur = closes[:-1], closes[1:]
+    ok = prev != 0
+    ret[1:][ok] = cur[ok] / prev[ok] - 1.0
+    return ret
+
+def _seed(closes: np.ndarray, ret: np.ndarray) -> ColumnState:
+    """The state push() leaves behind after closes (a column's valid closes in
+    order, ret = _returns(closes)), taken from the trailing windows."""
+    rets = ret[~np.isnan(ret)][-VOL_WINDOW:]
+    return ColumnState(float(closes[-1]), closes[-max(MA_WINDOWS):].tolist(),
+                       {w: float(closes[-w:].sum()) for w in MA_WINDOWS},
+                       rets.tolist(), float(rets.sum()), float((rets * rets).sum()))
+
+def _metrics(closes: np.ndarray, ret: np.ndarray) -> list:
+    """[ret, ma20, ma50, ma200, vol] arrays along closes, NaN where push()
+    would return None."""
+    s = pd.Series(closes)
+    mas = [s.rolling(w).mean().to_numpy() for w in MA_WINDOWS]
+    defined = ~np.isnan(ret)
+    vol = np.full(len(closes), np.nan)
+    vol[defined] = pd.Series(ret[defined]).rolling(VOL_WINDOW).std().to_numpy() * math.sqrt(TRADING_DAYS)
+    return [ret] + mas + [vol]
+
+def rebuild(rows=None, headers=None):
+    """Recompute the whole table and state from the journal, column-wise."""
+    headers = headers or journal.read_header()
+    rows = journal.load_rows() if rows is None else rows
+    rows = sorted((r for r in rows if (r.get("date") or "").strip()), key=lambda r: r["date"])
+    columns, precision = headers[1:], _precision()
+    empty = [""] * len(rows)
+    table = [[r["date"] for r in rows]]  # one list of cells per table column
+    states, prev = {}, {}
+    for col in columns:
+        cells = pd.Series([r.get(col) for r in rows], dtype=object)
+        values = pd.to_numeric(cells, errors="coerce").to_numpy(dtype=np.float64)
+        at = np.flatnonzero(~np.isnan(values))  # windows only see the valid closes
+        if not len(at):
+            table += [empty] * len(metric_names(col))
+            continue
+        closes = values[at]
+        ret = _returns(closes)
+        dps = [6] + [precision.get(col, 4)] * len(MA_WINDOWS) + [6]
+        for metric, dp in zip(_metrics(closes, ret), dps):
+            ok = ~np.isnan(metric)
+            cells = np.full(len(rows), "", dtype=object)
+            fmt = f"%.{dp}f"
+            cells[at[ok]] = [fmt % v for v in metric[ok].tolist()]
+            table.append(cells.tolist())
+        states[col] = _seed(closes, ret)
+        # state before the last row, for same-day re-runs
+        k = len(closes) - (at[-1] == len(rows) - 1)
+        if k:
+            prev[col] = _seed(closes[:k], ret[:k])
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(table_headers(columns))
+    w.writerows(zip(*table))
+    DERIVED_DIR.mkdir(parents=True, exist_ok=True)
+    journal.write_rendered(TABLE_PATH, buf.getvalue().encode())
+    save_state({
+        "columns": columns,
+        "last_date": rows[-1]["date"] if rows else None,
+        "prev": _dump_states(prev),
+        "current": _dump_states(states),
+    })
+    print(f"[derived] rebuilt {len(rows)} rows -> {TABLE_PATH}")
+
+def update(rows, before=None, headers=None) -> str:
+    """Fold just-written journal rows (oldest first) into the table.
+
+    before is journal.digests() taken ahead of the caller's own writes;
+    when it does not match what the state last saw, or a row is older than
+    the last derived date, the table is rebuilt. Otherwise each row costs
+    O(1) per column. Returns "rebuilt", "updated" or "unchanged".
+    """
+    headers = headers or journal.read_header()
+    columns = headers[1:]
+    state = load_state()
+    if (state is None or state.get("columns") != columns or not TABLE_PATH.exists()
+            or (before is not None and state.get("journal") != before)
+            or any(state["last_date"] and r["date"] < state["last_date"] for r in rows)):
+        rebuild(headers=headers)
+        return "rebuilt"
+    precision = _precision()
+    table_hdr = table_headers(columns)
+    written = len(journal.changed())
+    last_date, prev, current = state["last_date"], state["prev"], state["current"]
+    for r in rows:
+        base = prev if r["date"] == last_date else current  # same day re-run: replay from before it
+        states = _load_states(base)
+        journal.upsert_row(table_hdr, apply_row(states, r, columns, precision), TABLE_PATH)
+        last_date, prev, current = r["date"], base, _dump_states(states)
+    save_state({"columns": columns, "last_date": last_date, "prev": prev, "current": current})
+    if len(journal.changed()) == written:
+        print(f"[derived] unchanged")
+        return "unchanged"
+    print(f"[derived] {len(rows)} row(s) -> {TABLE_PATH}")
+    return "updated"
+
+if __name__ == "__main__":
+    import sys
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if cmd == "rebuild":
+        rebuild()
+    else:
+        dstr = sys.argv[2] if len(sys.argv) > 2 else None
+        rows = journal.load_rows(TABLE_PATH)
+        row = next((r for r in rows if r["date"] == dstr), None) if dstr else (rows[-1] if rows else None)
+        for k, v in (row or {}).items():
+            if v:
+                print(f"{k:28s} {v}")
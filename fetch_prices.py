@@ -1,64 +1,87 @@
 # fetch_prices.py
-import os, csv
-from datetime import datetime, timedelta, date
-from pathlib import Path
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, date, timezone
+from urllib.parse import quote
+import pandas as pd
 import yfinance as yf
 
+import artifacts
+import derived
+import fred_cache
+import instrumentation
+import instruments
+import journal
+import movers
+import providers
+import trading_calendar
+from journal import load_rows, read_last_row, upsert_row
+
 # ====== Config ======
-CSV_PATH = Path("data/etf_prices_log.csv")
-
-HEADERS = [
-    "date","EURO/USD","STG/USD","USD/YEN","NIKKEI","DAX","FTSE","DOW","S&P",
-    "JAPAN 10 YR (%)","GERMAN 10 YR (%)","UK 10 YR (%)","US 10 YR (%)",
-    "GOLD","BRENT CRUDE","BITCOIN"
-]
-
-# Yahoo Finance tickers (everything but JP/DE/UK 10Y)
-YF_TICKERS = {
-    "EURO/USD": "EURUSD=X",
-    "STG/USD": "GBPUSD=X",
-    "USD/YEN": "JPY=X",          # USD/JPY
-    "NIKKEI": "^N225",
-    "DAX": "^GDAXI",
-    "FTSE": "^FTSE",
-    "DOW": "^DJI",
-    "S&P": "^GSPC",
-    "GOLD": "GC=F",
-    "BRENT CRUDE": "BZ=F",
-    "BITCOIN": "BTC-USD",
-    # US 10Y via ^TNX (value is tenths of a percent; divide by 10)
-    "US 10 YR (%)": "^TNX",
-}
-
-# FRED fallback for JP/DE/UK 10Y (monthly OECD series, carry-forward)
-FRED_KEY = os.getenv("FRED_API_KEY")
-fred = None
-if FRED_KEY:
-    try:
-        from fredapi import Fred
-        fred = Fred(api_key=FRED_KEY)
-    except Exception:
-        fred = None
 
-FRED_SERIES = {
-    "GERMAN 10 YR (%)": "IRLTLT01DEM156N",
-    "UK 10 YR (%)":     "IRLTLT01GBM156N",
-    "JAPAN 10 YR (%)":  "IRLTLT01JPM156N",
-    "US 10 YR (%)":     "DGS10",  # Daily series from FRED as fallback
-}
+# Columns, Yahoo tickers, trading calendars, FRED series and per-column
+# precision / scaling all come from the instrument registry (instruments.json)
+HEADERS = instruments.headers()
+YF_TICKERS = instruments.yahoo_tickers()
+TICKER_EXCHANGE = instruments.ticker_exchange()
+PRECISION = instruments.precision()
+SCALE = instruments.scale()
+
+# Batched Yahoo downloads: tickers per grouped request, and how many of
+# those requests may run at once (registry "fetch" block / env overrides)
+YF_BATCH_SIZE = instruments.fetch_settings()["batch_size"]
+YF_MAX_WORKERS = instruments.fetch_settings()["max_workers"]
+
+# When set (e.g. to a replay_server.py stand-in), daily closes come from this
+# Yahoo chart endpoint through the pooled provider client instead of yfinance
+YAHOO_CHART_URL = os.getenv("YAHOO_CHART_URL")
+
+# Catch-up: most missed business days filled in one run, and how far back
+# FRED observations may be carried (monthly series)
+CATCHUP_MAX_DAYS = 370
+FRED_LOOKBACK_DAYS = 90
+
+# FRED source for the 10Y yields (monthly OECD series carried forward, DGS10
+# as the US fallback), served through the shared on-disk cache in fred_cache.py
+FRED_SERIES = instruments.fred_series()
 
 # ====== Helpers ======
 def today_str() -> str:
     return date.today().isoformat()
 
+def session_for(ticker: str, d: date) -> date:
+    """The trading session whose close is ticker's as-of close on d."""
+    exchange = TICKER_EXCHANGE.get(ticker)
+    return trading_calendar.asof_session(exchange, d) if exchange else d
+
 def get_close_yf(ticker: str, d: date):
     """Daily close on date d. If market closed, use previous trading day (carry-forward)."""
+    # The calendar knows the as-of session, so ask for just that bar
+    s = session_for(ticker, d)
+    if YAHOO_CHART_URL:
+        df = download_closes([ticker], d - timedelta(days=10), d + timedelta(days=1))
+        return asof_close(df[ticker], s) if ticker in df else None
+    try:
+        with instrumentation.call("yahoo", ticker) as rec:
+            df = yf.Ticker(ticker).history(
+                start=s, end=s + timedelta(days=1), interval="1d", auto_adjust=False
+            )
+            rec["ok"] = not df.empty
+        if not df.empty:
+            df.index = df.index.date
+            if s in df.index:
+                return float(df.loc[s, "Close"])
+    except Exception:
+        pass
+    # Calendar / provider disagree: fall back to searching a lookback window
     try:
         # Use a wider window: look back 10 days to find previous trading day if needed
-        df = yf.Ticker(ticker).history(
-            start=d - timedelta(days=10), end=d + timedelta(days=2),
-            interval="1d", auto_adjust=False
-        )
+        with instrumentation.call("yahoo", ticker) as rec:
+            rec["fallback"] = "lookback-window"
+            df = yf.Ticker(ticker).history(
+                start=d - timedelta(days=10), end=d + timedelta(days=2),
+                interval="1d", auto_adjust=False
+            )
         if not df.empty:
             # Convert index to date for comparison
             df.index = df.index.date
@@ -74,114 +97,198 @@ def get_close_yf(ticker: str, d: date):
         pass
     return None
 
-def get_us10y_from_yahoo(d: date):
-    """US 10Y from Yahoo ^TNX (reported in tenths of a percent)."""
-    v = get_close_yf("^TNX", d)
-    return None if v is None else (v)
-
-def fred_latest_leq(series_id: str, d: date):
-    """Most recent FRED value on/before d (handles monthly series). Returns float or None."""
-    if not fred:
-        return None
+def _chart_closes(ticker: str, start: date, end: date) -> pd.Series:
+    """Daily closes for one ticker over [start, end) from the YAHOO_CHART_URL endpoint."""
+    epoch = lambda d: int(datetime(d.year, d.month, d.day).timestamp())
+    params = {"period1": epoch(start), "period2": epoch(end), "interval": "1d"}
     try:
-        start = d - timedelta(days=90)
-        s = fred.get_series(series_id, observation_start=start, observation_end=d)
-        if s is not None:
-            s = s.dropna()
-            if len(s) > 0:
-                return float(s.iloc[-1])  # <-- return raw float
+        data = providers.get_json(f"{YAHOO_CHART_URL}/{quote(ticker, safe='')}", params)
+        res = data["chart"]["result"][0]
+        offset = res.get("meta", {}).get("gmtoffset", 0)
+        closes = res["indicators"]["quote"][0]["close"]
+        days = [datetime.fromtimestamp(ts + offset, timezone.utc).date() for ts in res.get("timestamp", [])]
     except Exception:
-        pass
-    return None
-
+        return pd.Series(dtype=float)
+    s = pd.Series(closes, index=days, dtype=float).dropna()
+    return s[~s.index.duplicated(keep="last")]
 
-def ensure_header():
-    CSV_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not CSV_PATH.exists():
-        with open(CSV_PATH, "w", newline="") as f:
-            csv.writer(f).writerow(HEADERS)
-
-def load_rows():
-    if not CSV_PATH.exists(): return []
-    with open(CSV_PATH, newline="") as f:
-        return list(csv.DictReader(f))
-
-def write_rows(headers, rows):
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
-
-def get_last_known_value(rows, col_name: str, before_date: date):
-    """Find the most recent non-empty value for a column before the given date."""
-    last_val = None
-    for r in rows:
-        dstr = r.get("date", "").strip()
-        if not dstr:
-            continue
-        try:
-            d = datetime.strptime(dstr, "%Y-%m-%d").date()
-            if d >= before_date:
+def download_chunk(tickers: list[str], start: date, end: date) -> pd.DataFrame:
+    """One grouped yf.download for a chunk of tickers -> Close frame (date index, ticker columns)."""
+    if YAHOO_CHART_URL:
+        closes = {t: _chart_closes(t, start, end) for t in tickers}
+        return pd.DataFrame({t: s for t, s in closes.items() if not s.empty})
+    try:
+        with instrumentation.call("yahoo", ",".join(tickers)) as rec:
+            df = yf.download(
+                tickers, start=start, end=end, interval="1d", auto_adjust=False,
+                group_by="ticker", threads=False, progress=False,
+            )
+            rec["ok"] = df is not None and not df.empty
+    except Exception:
+        return pd.DataFrame()
+    if df is None or df.empty:
+        return pd.DataFrame()
+    closes = {}
+    for t in tickers:
+        if isinstance(df.columns, pd.MultiIndex):
+            if t not in df.columns.get_level_values(0):
                 continue
-            val_str = r.get(col_name, "").strip()
-            if val_str:
-                try:
-                    last_val = float(val_str)
-                except ValueError:
-                    pass
-        except Exception:
-            continue
-    return last_val
+            sub = df[t]
+        else:
+            sub = df
+        if "Close" in sub:
+            closes[t] = sub["Close"]
+    out = pd.DataFrame(closes)
+    out.index = pd.to_datetime(out.index).date
+    return out
 
-# ====== Main ======
-def main(target_date: str | None = None):
-    ensure_header()
-    rows = load_rows()
-    have_by_date = {r.get("date"): i for i, r in enumerate(rows) if r.get("date")}
+def download_closes(tickers, start: date, end: date) -> pd.DataFrame:
+    """Daily closes for all tickers over [start, end), fetched in grouped
+    chunks of YF_BATCH_SIZE spread over YF_MAX_WORKERS threads."""
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + YF_BATCH_SIZE] for i in range(0, len(tickers), YF_BATCH_SIZE)]
+    if not chunks:
+        return pd.DataFrame()
+    with ThreadPoolExecutor(max_workers=min(YF_MAX_WORKERS, len(chunks))) as pool:
+        frames = list(pool.map(lambda c: download_chunk(c, start, end), chunks))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1).sort_index()
 
-    dstr = target_date or today_str()
-    d = datetime.strptime(dstr, "%Y-%m-%d").date()
+def asof_close(closes: pd.Series, d: date):
+    """Close on d, or the most recent close before d (carry-forward)."""
+    s = closes.dropna()
+    s = s[s.index <= d]
+    if s.empty:
+        return None
+    return float(s.iloc[-1])
+
+def ensure_header():
+    journal.ensure_header(HEADERS)
 
-    # start with existing row or a fresh one
-    if dstr in have_by_date:
-        row = rows[have_by_date[dstr]].copy()
-    else:
-        row = {h: "" for h in HEADERS}
-        row["date"] = dstr
+def missing_days(last_dstr: str, d: date) -> list:
+    """Business days after the last journal row and before d (at most CATCHUP_MAX_DAYS)."""
+    start = datetime.strptime(last_dstr, "%Y-%m-%d").date() + timedelta(days=1)
+    days = [ts.date() for ts in pd.bdate_range(start, d - timedelta(days=1))]
+    if len(days) > CATCHUP_MAX_DAYS:
+        lo, hi = days[0], days[-CATCHUP_MAX_DAYS - 1]
+        print(f"[warn] {len(days)} business days missing since {last_dstr}; only the last "
+              f"{CATCHUP_MAX_DAYS} are caught up. {lo}..{hi} stays empty - fill it with: "
+              f"python backfill_prices.py {lo} {hi}")
+    return days[-CATCHUP_MAX_DAYS:]
 
+def fill_row(row: dict, d: date, closes: pd.DataFrame, fred_index: dict, retry: bool = False):
+    """Fill row's prices / yields for d from the pre-fetched closes and FRED indexes."""
     # --- Yahoo prices ---
     for name, t in YF_TICKERS.items():
-        if name == "US 10 YR (%)":
-            v = get_us10y_from_yahoo(d)
-        else:
+        v = asof_close(closes[t], session_for(t, d)) if t in closes else None
+        if v is None and retry:
+            # batch missed this ticker; retry it on its own
             v = get_close_yf(t, d)
         if v is not None:
-            row[name] = f"{v:.4f}"
+            row[name] = f"{v * SCALE[name]:.{PRECISION[name]}f}"
 
     # --- FRED fallback and carry-forward for all 10Y yields (JP/DE/UK/US) ---
     for name, sid in FRED_SERIES.items():
         if not row.get(name):
             # Try FRED first
-            v = fred_latest_leq(sid, d)
+            v = fred_index[sid].latest_leq(d, max_age_days=FRED_LOOKBACK_DAYS)
             # If FRED fails, try to carry forward last known value
+            # (constant-time lookup in the journal's last-valid-value index)
             if v is None:
-                v = get_last_known_value(rows, name, d)
+                v = journal.last_known_value(name, d)
+                instrumentation.record_call("fred", sid, 0.0, fallback="carry-forward",
+                                            ok=v is not None)
             if v is not None:
-                row[name] = f"{v:.4f}"  # <-- format once here
+                row[name] = f"{v:.{PRECISION[name]}f}"  # <-- format once here
+    return row
+
+# ====== Main ======
+def github_output(**values):
+    """Append key=value lines to $GITHUB_OUTPUT (no-op outside Actions)."""
+    out = os.getenv("GITHUB_OUTPUT")
+    if not out:
+        return
+    with open(out, "a") as f:
+        for k, v in values.items():
+            f.write(f"{k}={v}\n")
+
+def main(target_date: str | None = None):
+    ensure_header()
+    dstr = target_date or today_str()
+    d = datetime.strptime(dstr, "%Y-%m-%d").date()
+
+    # The daily run only touches the last row; the full history is read
+    # only for an out-of-order date.
+    with instrumentation.stage("journal-read"):
+        last = read_last_row()
+        if last is not None and last.get("date", "") > dstr:
+            existing = next((r for r in load_rows() if r.get("date") == dstr), None)
+        else:
+            existing = last if last is not None and last.get("date") == dstr else None
+
+    # Catch up on business days missed since the last row (e.g. skipped runs)
+    days = [d]
+    if last is not None and last.get("date", "") < dstr:
+        gaps = missing_days(last["date"], d)
+        if gaps:
+            print(f"[catch-up] {len(gaps)} missing business day(s) since {last['date']}")
+        days = gaps + [d]
+
+    # One batched Yahoo download and one request per FRED series cover every
+    # day; the calendar bounds the download to the earliest as-of session
+    first = min(session_for(t, days[0]) for t in YF_TICKERS.values())
+    with instrumentation.stage("yahoo"):
+        closes = download_closes(YF_TICKERS.values(), first, d + timedelta(days=1))
+    with instrumentation.stage("fred"):
+        fred_index = fred_cache.SeriesIndex.fetch_many(
+            FRED_SERIES.values(), days[0] - timedelta(days=FRED_LOOKBACK_DAYS), d
+        )
+
+    # journal digests before this run's writes, so the derived views can tell
+    # whether they are still in step with it
+    journal_before = journal.digests()
+    written = []
+    for day in days:
+        if day == d and existing is not None:
+            # start with existing row or a fresh one
+            row = existing.copy()
+        else:
+            row = {h: "" for h in HEADERS}
+            row["date"] = day.isoformat()
+        with instrumentation.stage("fill"):
+            fill_row(row, day, closes, fred_index, retry=(day == d))
+
+        # upsert (append / rewrite the last line in place; full rewrite only if needed)
+        with instrumentation.stage("upsert"):
+            action = upsert_row(HEADERS, row)
+        if action == "unchanged":
+            print(f"[unchanged] {row['date']} -> daily closes already up to date")
+        else:
+            print(f"[{action}] {row['date']} -> wrote daily closes at 4dp")
+        written.append(row)
+
+    # Returns / moving averages / volatility (data/derived/); incremental
+    # unless the journal was changed behind its back
+    with instrumentation.stage("derived"):
+        derived.update(written, before=journal_before)
 
+    # Compact JSON views for the website (data/artifacts/); only latest.json
+    # and the series these rows changed are re-encoded
+    with instrumentation.stage("artifacts"):
+        artifacts.update(written, before=journal_before)
 
-    # upsert
-    if dstr in have_by_date:
-        rows[have_by_date[dstr]] = row
-        action = "updated"
-    else:
-        rows.append(row)
-        action = "added"
+    # Top movers / outliers by rolling z-score (data/artifacts/movers.json)
+    with instrumentation.stage("movers"):
+        movers.build()
 
-    # persist entire file (keeps formatting consistent)
-    write_rows(HEADERS, rows)
-    print(f"[{action}] {dstr} -> wrote daily closes at 4dp")
+    # changed=true/false for the workflow's commit step
+    changed = journal.changed()
+    print(f"[changed] {len(changed)} data file(s)" if changed else "[unchanged] no data files written")
+    github_output(changed="true" if changed else "false", files=len(changed))
 
 if __name__ == "__main__":
     import sys
-    main(sys.argv[1] if len(sys.argv) > 1 else None)
+    with instrumentation.session("fetch_prices"):
+        main(sys.argv[1] if len(sys.argv) > 1 else None)
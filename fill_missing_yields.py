@@ -1,53 +1,27 @@
 # fill_missing_yields.py
-import os, csv
-from datetime import datetime, timedelta, date
-from pathlib import Path
+from datetime import datetime
 
-FRED_KEY = os.getenv("FRED_API_KEY")
-fred = None
-if FRED_KEY:
-    try:
-        from fredapi import Fred
-        fred = Fred(api_key=FRED_KEY)
-    except Exception:
-        fred = None
+import instruments
+import journal
+from fred_cache import fred_latest_leq
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+CSV_PATH = journal.CSV_PATH
 TARGET_DATES = {
     "2025-09-05","2025-09-08","2025-09-09","2025-09-10",
     "2025-09-11","2025-09-12","2025-09-15","2025-09-16",
 }
 
-FRED_SERIES = {
-    "US 10 YR (%)":  {"id": "DGS10"},             # daily
-    "GERMAN 10 YR (%)": {"id": "IRLTLT01DEM156N"},# monthly
-    "UK 10 YR (%)":     {"id": "IRLTLT01GBM156N"},# monthly
-    "JAPAN 10 YR (%)":  {"id": "IRLTLT01JPM156N"},# monthly
-}
+# every yield column with a FRED series (daily DGS10, monthly OECD series)
+FRED_SERIES = {col: {"id": sid} for col, sid in instruments.fred_series().items()}
 
 def iso(s): return datetime.strptime(s, "%Y-%m-%d").date()
 
-def fred_latest_leq(series_id: str, d: date):
-    if not fred:
-        return None
-    try:
-        start = d - timedelta(days=90)
-        s = fred.get_series(series_id, observation_start=start, observation_end=d)
-        if s is not None:
-            s = s.dropna()
-            if len(s) > 0:
-                return float(s.iloc[-1])
-    except Exception:
-        pass
-    return None
-
 def main():
-    if not CSV_PATH.exists():
+    if not journal.files():
         print("CSV not found:", CSV_PATH); return
 
-    with open(CSV_PATH, newline="") as f:
-        rows = list(csv.DictReader(f))
-        headers = f.fieldnames
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     changed = 0
     for r in rows:
@@ -68,11 +42,10 @@ def main():
         return
 
     # Write back (overwrite CSV)
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
+    journal.write_rows(headers, rows)
     print(f"[done] Updated CSV with {changed} filled values.")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("fill_missing_yields"):
+        main()
@@ -1,21 +1,19 @@
 # fix_missing_nikkei.py
 # Fix missing NIKKEI values for Japanese market holidays by using previous trading day
-import csv
-from pathlib import Path
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+import journal
+
+CSV_PATH = journal.CSV_PATH
 COL = "NIKKEI"
 
 def main():
-    if not CSV_PATH.exists():
+    if not journal.files():
         print(f"[error] CSV not found: {CSV_PATH}")
         return
 
     # Load all rows
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames
-        rows = list(reader)
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     if not headers:
         print("[error] No headers found")
@@ -50,12 +48,11 @@ def main():
         return
 
     # Write back
-    with open(CSV_PATH, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
+    journal.write_rows(headers, rows)
 
     print(f"[done] Filled {fixed} missing NIKKEI values")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("fix_missing_nikkei"):
+        main()
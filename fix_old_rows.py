@@ -1,13 +1,13 @@
 # fix_old_rows.py
-import csv
-import shutil
-from pathlib import Path
 import argparse
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+import instruments
+import journal
+
+CSV_PATH = journal.CSV_PATH
 
 US_COL   = "US 10 YR (%)"
-FOUR_DP_COLS = ["JAPAN 10 YR (%)", "GERMAN 10 YR (%)", "UK 10 YR (%)", US_COL]
+FOUR_DP_COLS = instruments.columns("yield")
 
 def parse_args():
     p = argparse.ArgumentParser(description="Fix historical yield rows in CSV.")
@@ -24,20 +24,18 @@ def to_float(s):
 def main():
     args = parse_args()
 
-    if not CSV_PATH.exists():
+    if not journal.files():
         print(f"[error] CSV not found: {CSV_PATH}")
         return
 
-    # Backup first
+    headers = journal.read_header()
+    rows = journal.load_rows()
+
+    # Backup first (the whole journal as one flat file)
     bk = CSV_PATH.with_suffix(".bak")
-    shutil.copyfile(CSV_PATH, bk)
+    journal.write_rows(headers, rows, bk)
     print(f"[backup] Wrote {bk}")
 
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames or []
-        rows = list(reader)
-
     if US_COL not in headers:
         print(f"[error] Column not found: {US_COL}")
         return
@@ -64,8 +62,10 @@ def main():
                     r[US_COL] = f"{usv:.4f}"
                     four_dp_set += 1
 
-        # 2) Normalize JP/DE/UK to 4dp
-        for c in ["JAPAN 10 YR (%)", "GERMAN 10 YR (%)", "UK 10 YR (%)"]:
+        # 2) Normalize the other yields to 4dp
+        for c in FOUR_DP_COLS:
+            if c == US_COL:
+                continue
             v = to_float(r.get(c, ""))
             if v is not None:
                 r[c] = f"{v:.4f}"
@@ -76,13 +76,12 @@ def main():
         rows.sort(key=lambda x: x.get("date", ""))
 
     # 4) Write back
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
+    journal.write_rows(headers, rows)
 
     print(f"[done] US 10Y scaled: {us_scaled} rows; 4dp normalized: {four_dp_set} cells")
-    print(f"[ok] Updated {CSV_PATH}")
+    print("[ok] Updated the journal")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("fix_old_rows"):
+        main()
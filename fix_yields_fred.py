@@ -1,11 +1,13 @@
 # fix_yields_fred.py
 # Fetch actual FRED data and update all dates with correct monthly values
-import os, csv
-from datetime import datetime, date
-from pathlib import Path
-import requests
+import os
+from datetime import datetime
 import urllib3
 
+import fred_cache
+import instruments
+import journal
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 FRED_KEY = os.getenv("FRED_API_KEY")
@@ -13,77 +15,48 @@ if not FRED_KEY:
     print("[error] FRED_API_KEY not set")
     exit(1)
 
-FRED_BASE_URL = "https://api.stlouisfed.org/fred/series/observations"
-
-CSV_PATH = Path("data/etf_prices_log.csv")
-
-FRED_SERIES = {
-    "GERMAN 10 YR (%)": "IRLTLT01DEM156N",
-    "UK 10 YR (%)":     "IRLTLT01GBM156N",
-    "JAPAN 10 YR (%)":  "IRLTLT01JPM156N",
-}
-
-def fetch_fred_series(series_id: str):
-    """Fetch full FRED series and return dict mapping YYYY-MM to value."""
-    try:
-        params = {
-            "series_id": series_id,
-            "api_key": FRED_KEY,
-            "file_type": "json",
-            "observation_start": "2025-01-01",  # Start from beginning of year
-        }
-        
-        resp = requests.get(FRED_BASE_URL, params=params, timeout=30, verify=False)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        if "observations" not in data:
-            return {}
-        
-        # Create mapping: YYYY-MM -> value
-        monthly_values = {}
-        for obs in data["observations"]:
-            val = obs.get("value", ".")
-            if val != "." and val is not None:
-                try:
-                    date_str = obs["date"]
-                    # Extract YYYY-MM from date
-                    year_month = date_str[:7]  # "2025-09" from "2025-09-15"
-                    monthly_values[year_month] = float(val)
-                except (ValueError, TypeError, KeyError):
-                    continue
-        
-        return monthly_values
-    except Exception as e:
-        print(f"[error] Failed to fetch {series_id}: {e}")
-        return {}
+CSV_PATH = journal.CSV_PATH
+
+# FRED-sourced yield columns from the instrument registry
+FRED_SERIES = instruments.fred_series(primary_only=True)
+
+def to_monthly(obs):
+    """FRED observations -> dict mapping YYYY-MM to value."""
+    values = {}
+    for date_str, val in obs:
+        year_month = date_str[:7]  # "2025-09" from "2025-09-15"
+        values[year_month] = val
+    return values
 
 def main():
-    if not CSV_PATH.exists():
+    if not journal.files():
         print(f"[error] CSV not found: {CSV_PATH}")
         return
 
-    # Fetch all FRED series
+    # Fetch all FRED series (concurrently, from the beginning of the year)
     print("Fetching FRED data...")
+    results = fred_cache.observations_many(
+        [(sid, "2025-01-01", None) for sid in FRED_SERIES.values()], verify=False
+    )
     fred_data = {}
-    for col_name, series_id in FRED_SERIES.items():
-        print(f"  Fetching {col_name} ({series_id})...")
-        monthly_values = fetch_fred_series(series_id)
-        if monthly_values:
-            fred_data[col_name] = monthly_values
-            print(f"    Got {len(monthly_values)} monthly values")
+    for (col_name, series_id), obs in zip(FRED_SERIES.items(), results):
+        if isinstance(obs, Exception):
+            print(f"[error] Failed to fetch {series_id}: {obs}")
+            obs = []
+        values = to_monthly(obs)
+        if values:
+            fred_data[col_name] = values
+            print(f"  {col_name} ({series_id}): {len(values)} monthly values")
         else:
-            print(f"    [warn] No data for {col_name}")
+            print(f"  [warn] No data for {col_name}")
 
     if not fred_data:
         print("[error] No FRED data retrieved")
         return
 
     # Load CSV
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames
-        rows = list(reader)
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     # Update rows with FRED data
     changed = 0
@@ -115,13 +88,13 @@ def main():
         return
 
     # Write back
-    with open(CSV_PATH, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
+    journal.write_rows(headers, rows)
 
     print(f"[done] Updated {changed} values from FRED")
+    print(f"[cache] FRED {fred_cache.summary()}")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("fix_yields_fred"):
+        main()
 
@@ -0,0 +1,251 @@
+# fred_cache.py
+# Shared FRED observations client with a persistent on-disk response cache.
+#
+# Responses are cached per (series id, observation window) under CACHE_DIR,
+# stay fresh for a TTL that depends on how often the series updates, and are
+# evicted least-recently-used once the cache grows past CACHE_MAX_BYTES.
+import os, json, time, hashlib
+from bisect import bisect_right
+from datetime import date, timedelta
+from pathlib import Path
+
+import instrumentation
+import instruments
+import providers
+
+FRED_KEY = os.getenv("FRED_API_KEY")
+# overridable to point at a local stand-in (see replay_server.py)
+FRED_BASE_URL = os.getenv("FRED_BASE_URL", "https://api.stlouisfed.org/fred/series/observations")
+
+CACHE_DIR = Path(os.getenv("FRED_CACHE_DIR", ".cache/fred"))
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# How long a cached response is trusted, by series frequency
+TTL_SECONDS = {
+    "daily":   6 * 3600,
+    "monthly": 7 * 24 * 3600,
+}
+
+SERIES_FREQUENCY = instruments.fred_frequency()
+DEFAULT_FREQUENCY = "daily"  # unknown series get the shortest TTL
+
+# hit / miss / eviction counters for the current process
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _iso(d) -> str:
+    return "" if d is None else (d.isoformat() if isinstance(d, date) else str(d))
+
+def _cache_path(series_id: str, start: str, end: str) -> Path:
+    key = f"{series_id}|{start}|{end}"
+    return CACHE_DIR / f"{series_id}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.json"
+
+def ttl_for(series_id: str) -> int:
+    return TTL_SECONDS[SERIES_FREQUENCY.get(series_id, DEFAULT_FREQUENCY)]
+
+def _read_cached(path: Path, series_id: str):
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("fetched_at", 0) > ttl_for(series_id):
+        return None
+    os.utime(path)  # mark as recently used for LRU eviction
+    return [tuple(o) for o in entry["observations"]]
+
+def _write_cached(path: Path, series_id: str, start: str, end: str, obs):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "series_id": series_id, "start": start, "end": end,
+        "fetched_at": time.time(), "observations": obs,
+    }
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp, path)
+    evict()
+
+def evict(max_bytes: int = CACHE_MAX_BYTES):
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    if not CACHE_DIR.exists():
+        return
+    entries = []
+    for p in CACHE_DIR.glob("*.json"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        try:
+            p.unlink()
+        except OSError:
+            continue
+        total -= size
+        stats["evictions"] += 1
+
+def _params(series_id: str, start: str, end: str) -> dict:
+    params = {
+        "series_id": series_id,
+        "api_key": FRED_KEY,
+        "file_type": "json",
+    }
+    if start:
+        params["observation_start"] = start
+    if end:
+        params["observation_end"] = end
+    return params
+
+def _parse(data):
+    obs = []
+    for o in data.get("observations", []):
+        val = o.get("value", ".")
+        if val == "." or val is None:
+            continue
+        try:
+            obs.append((o["date"], float(val)))
+        except (ValueError, TypeError, KeyError):
+            continue
+    obs.sort()
+    return obs
+
+def _fetch(series_id: str, start: str, end: str, verify: bool = True):
+    return _parse(providers.get_json(FRED_BASE_URL, _params(series_id, start, end), verify=verify))
+
+def observations(series_id: str, start=None, end=None, verify: bool = True):
+    """Non-missing (YYYY-MM-DD, value) pairs for series_id within [start, end],
+    sorted by date. Served from the cache when fresh; raises on fetch errors.
+    Returns [] when no FRED_API_KEY is configured."""
+    if not FRED_KEY:
+        return []
+    start, end = _iso(start), _iso(end)
+    path = _cache_path(series_id, start, end)
+    t0 = time.perf_counter()
+    cached = _read_cached(path, series_id)
+    if cached is not None:
+        stats["hits"] += 1
+        instrumentation.record_call("fred", series_id, time.perf_counter() - t0, cache_hit=True)
+        return cached
+    stats["misses"] += 1
+    obs = _fetch(series_id, start, end, verify=verify)
+    _write_cached(path, series_id, start, end, obs)
+    return obs
+
+def observations_many(specs, verify: bool = True):
+    """observations() for many (series_id, start, end) at once: cache hits are
+    served locally and all misses are fetched concurrently. Returns a list in
+    request order; a failed fetch yields the exception instead of a list."""
+    specs = [(sid, _iso(start), _iso(end)) for sid, start, end in specs]
+    if not FRED_KEY:
+        return [[] for _ in specs]
+    results = [None] * len(specs)
+    misses = []
+    for i, (sid, start, end) in enumerate(specs):
+        t0 = time.perf_counter()
+        cached = _read_cached(_cache_path(sid, start, end), sid)
+        if cached is not None:
+            stats["hits"] += 1
+            instrumentation.record_call("fred", sid, time.perf_counter() - t0, cache_hit=True)
+            results[i] = cached
+        else:
+            stats["misses"] += 1
+            misses.append(i)
+    calls = [(FRED_BASE_URL, _params(*specs[i])) for i in misses]
+    for i, data in zip(misses, providers.fetch_all_json(calls, verify=verify)):
+        if isinstance(data, Exception):
+            results[i] = data
+            continue
+        try:
+            obs = _parse(data)
+        except Exception as e:
+            results[i] = e
+            continue
+        sid, start, end = specs[i]
+        _write_cached(_cache_path(sid, start, end), sid, start, end, obs)
+        results[i] = obs
+    return results
+
+def fred_latest_leq(series_id: str, d: date, lookback_days: int = 90, verify: bool = True):
+    """Most recent FRED value on/before d (handles monthly series). Returns float or None."""
+    if not FRED_KEY:
+        return None
+    try:
+        obs = observations(series_id, d - timedelta(days=lookback_days), d, verify=verify)
+        if obs:
+            return obs[-1][1]
+    except Exception as e:
+        print(f"[warn] FRED lookup failed for {series_id} on {d}: {e}")
+    return None
+
+class SeriesIndex:
+    """One series fetched once into sorted date/value lists; latest_leq(d)
+    then answers "last value on or before d" by binary search."""
+
+    def __init__(self, series_id: str, obs):
+        self.series_id = series_id
+        self.dates = [d for d, _ in obs]
+        self.values = [v for _, v in obs]
+
+    @classmethod
+    def fetch(cls, series_id: str, start=None, end=None, verify: bool = True):
+        return cls(series_id, observations(series_id, start, end, verify=verify))
+
+    @classmethod
+    def fetch_many(cls, series_ids, start=None, end=None, verify: bool = True, ckpt=None) -> dict:
+        """{series_id: SeriesIndex} fetched concurrently; failed series come back empty.
+        With a checkpoint (checkpoint.Checkpoint), series it already holds are
+        not refetched and newly fetched ones are recorded in it (failed ones
+        are left to be retried)."""
+        series_ids = list(dict.fromkeys(series_ids))
+        out = {}
+        if ckpt is not None:
+            for sid in series_ids:
+                obs = ckpt.get(f"series:{sid}")
+                if obs is not None:
+                    out[sid] = cls(sid, [tuple(o) for o in obs])
+        missing = [sid for sid in series_ids if sid not in out]
+        results = observations_many([(sid, start, end) for sid in missing], verify=verify) if missing else []
+        for sid, obs in zip(missing, results):
+            if isinstance(obs, Exception):
+                print(f"[warn] FRED fetch failed for {sid}: {obs}")
+                obs = []
+            elif ckpt is not None and obs:
+                ckpt.record(f"series:{sid}", [list(o) for o in obs])
+            out[sid] = cls(sid, obs)
+        return {sid: out[sid] for sid in series_ids}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def latest_leq(self, d, max_age_days: int | None = None):
+        """Most recent value dated on/before d, optionally no older than max_age_days."""
+        i = bisect_right(self.dates, _iso(d))
+        if i == 0:
+            return None
+        if max_age_days is not None:
+            oldest = _iso(date.fromisoformat(_iso(d)) - timedelta(days=max_age_days))
+            if self.dates[i - 1] < oldest:
+                return None
+        return self.values[i - 1]
+
+def summary() -> str:
+    return f"hits={stats['hits']} misses={stats['misses']} evictions={stats['evictions']}"
+
+def clear():
+    if CACHE_DIR.exists():
+        for p in CACHE_DIR.glob("*.json"):
+            p.unlink()
+
+if __name__ == "__main__":
+    import sys
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if cmd == "clear":
+        clear()
+        print(f"[ok] cleared {CACHE_DIR}")
+    else:
+        files = list(CACHE_DIR.glob("*.json")) if CACHE_DIR.exists() else []
+        size = sum(p.stat().st_size for p in files)
+        print(f"[info] {CACHE_DIR}: {len(files)} entries, {size} bytes (max {CACHE_MAX_BYTES})")
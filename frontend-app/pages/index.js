@@ -3,31 +3,35 @@
 const OWNER = "zerradwan";
 const REPO = "MarketJournal";
 const BRANCH = "main";
-const RAW_CSV_URL = `https://raw.githubusercontent.com/${OWNER}/${REPO}/${BRANCH}/data/etf_prices_log.csv`;
+// Pre-sorted compact view written by the Python pipeline (artifacts.py):
+// { columns, precision, rows: [[date, v1, v2, ...], ...] }, oldest → newest
+const LATEST_URL = `https://raw.githubusercontent.com/${OWNER}/${REPO}/${BRANCH}/data/artifacts/latest.json`;
 
-export async function getServerSideProps() {
+// The artifact only changes once a day, so let the CDN serve the rendered
+// page (getServerSideProps has no fetch cache; this header is the caching)
+const CACHE_CONTROL = "public, s-maxage=600, stale-while-revalidate=86400";
+
+export async function getServerSideProps({ res: pageRes }) {
+  pageRes.setHeader("Cache-Control", CACHE_CONTROL);
   try {
-    const res = await fetch(RAW_CSV_URL, { cache: "no-store" });
+    const res = await fetch(LATEST_URL);
     if (!res.ok) {
       return { props: { headers: [], rows: [], error: `Fetch failed: ${res.status}` } };
     }
 
-    const csv = (await res.text()).trim();
-    if (!csv) return { props: { headers: [], rows: [], error: "CSV empty" } };
-
-    const lines = csv.split(/\r?\n/).filter(Boolean);
-    const headers = lines[0].split(",").map((s) => s.trim());
+    const { columns = [], precision = [], rows: data = [] } = await res.json();
+    if (!data.length) return { props: { headers: [], rows: [], error: "No rows in artifact" } };
 
-    const rows = lines.slice(1).map((line) => {
-      const cols = line.split(",").map((s) => s.trim());
-      const obj = {};
-      headers.forEach((h, i) => (obj[h] = cols[i] ?? ""));
+    const headers = ["date", ...columns];
+    const rows = data.map(([date, ...values]) => {
+      const obj = { date };
+      columns.forEach((c, i) => {
+        const v = values[i];
+        obj[c] = v == null ? "" : v.toFixed(precision[i] ?? 4);
+      });
       return obj;
     });
 
-    // sort by date ascending (oldest → newest)
-    rows.sort((a, b) => new Date(a.date) - new Date(b.date));
-
     return { props: { headers, rows, error: null } };
   } catch (e) {
     return { props: { headers: [], rows: [], error: e?.message || "Unknown error" } };
@@ -61,7 +65,7 @@ export default function Home({ headers, rows, error }) {
             {rows.length === 0 ? (
               <tr>
                 <td colSpan={headers.length} style={{ padding: 12, textAlign: "center", color: "#888" }}>
-                  No data yet. Ensure the CSV exists at <code>data/etf_prices_log.csv</code>.
+                  No data yet. Ensure <code>data/artifacts/latest.json</code> has been built.
                 </td>
               </tr>
             ) : (
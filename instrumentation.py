@@ -0,0 +1,150 @@
+# instrumentation.py
+# Run-level instrumentation: per provider-call records, per-stage timings and
+# a structured JSON run report, so a slow daily job can be attributed to a
+# ticker, provider or stage.
+#
+#   with instrumentation.session("fetch_prices"):
+#       with instrumentation.stage("yahoo"):
+#           ...
+#
+# Each call record holds provider, target, wall time, bytes received,
+# retries, cache hit and fallback (e.g. FRED -> carry-forward). Outside a
+# session nothing is recorded. Reports go to REPORT_DIR/<name>-<stamp>.json.
+#
+# Opt-in profiling via RUN_PROFILE:
+#   RUN_PROFILE=cpu   cProfile; top functions added to the report (+ .prof file)
+#   RUN_PROFILE=mem   tracemalloc; peak and top allocation sites
+#   RUN_PROFILE=all   both
+import cProfile, io, json, os, platform, pstats, threading, time, tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+REPORT_DIR = Path(os.getenv("RUN_REPORT_DIR", "reports"))
+PROFILE = os.getenv("RUN_PROFILE", "").lower()
+PROFILE_TOP = 25
+
+_run = None
+_lock = threading.Lock()
+
+def active() -> bool:
+    return _run is not None
+
+def record_call(provider: str, target: str, seconds: float, nbytes: int = 0, retries: int = 0,
+                cache_hit: bool = False, fallback: str | None = None, ok: bool = True):
+    """Add one provider-call record to the current run (no-op outside a session)."""
+    if _run is None:
+        return
+    with _lock:
+        _run["calls"].append({
+            "provider": provider, "target": target, "seconds": round(seconds, 6),
+            "bytes": nbytes, "retries": retries, "cache_hit": cache_hit,
+            "fallback": fallback, "ok": ok,
+        })
+
+@contextmanager
+def call(provider: str, target: str):
+    """Time a provider call; the yielded dict takes bytes/retries/cache_hit/fallback/ok."""
+    rec = {}
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except Exception:
+        rec["ok"] = False
+        raise
+    finally:
+        record_call(provider, target, time.perf_counter() - t0, rec.get("bytes", 0),
+                    rec.get("retries", 0), rec.get("cache_hit", False),
+                    rec.get("fallback"), rec.get("ok", True))
+
+@contextmanager
+def stage(name: str):
+    """Accumulate wall time under a named stage of the current run."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _run is not None:
+            with _lock:
+                _run["stages"][name] = _run["stages"].get(name, 0.0) + time.perf_counter() - t0
+
+def _summarize(calls):
+    by_provider = {}
+    for c in calls:
+        p = by_provider.setdefault(c["provider"], {
+            "calls": 0, "seconds": 0.0, "bytes": 0, "retries": 0,
+            "cache_hits": 0, "fallbacks": 0, "errors": 0,
+        })
+        p["calls"] += 1
+        p["seconds"] = round(p["seconds"] + c["seconds"], 6)
+        p["bytes"] += c["bytes"]
+        p["retries"] += c["retries"]
+        p["cache_hits"] += c["cache_hit"]
+        p["fallbacks"] += c["fallback"] is not None
+        p["errors"] += not c["ok"]
+    return by_provider
+
+def _cpu_top(profiler):
+    out = io.StringIO()
+    st = pstats.Stats(profiler, stream=out)
+    rows = []
+    for (fname, line, func), (cc, nc, tt, ct, _) in sorted(
+            st.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:PROFILE_TOP]:
+        rows.append({"function": f"{fname}:{line}({func})", "calls": nc,
+                     "tottime": round(tt, 6), "cumtime": round(ct, 6)})
+    return rows
+
+def _mem_top(snapshot):
+    return [{"site": str(s.traceback), "kib": round(s.size / 1024, 1), "count": s.count}
+            for s in snapshot.statistics("lineno")[:PROFILE_TOP]]
+
+@contextmanager
+def session(name: str, profile: str | None = None):
+    """Instrument one run of a script and write its JSON report on exit."""
+    global _run
+    profile = (PROFILE if profile is None else profile).lower()
+    cpu = profile in ("cpu", "all")
+    mem = profile in ("mem", "all")
+    _run = {"calls": [], "stages": {}}
+    started = time.time()
+    t0 = time.perf_counter()
+    profiler = cProfile.Profile() if cpu else None
+    if mem:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    status = "ok"
+    try:
+        yield _run
+    except BaseException as e:
+        status = f"error: {e!r}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        run, _run = _run, None
+        report = {
+            "name": name,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(started)),
+            "status": status,
+            "total_seconds": round(time.perf_counter() - t0, 6),
+            "python": platform.python_version(),
+            "stages": {k: round(v, 6) for k, v in run["stages"].items()},
+            "providers": _summarize(run["calls"]),
+            "slowest_calls": sorted(run["calls"], key=lambda c: c["seconds"], reverse=True)[:10],
+            "calls": run["calls"],
+        }
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started))
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        if profiler:
+            prof_path = REPORT_DIR / f"{name}-{stamp}.prof"
+            profiler.dump_stats(prof_path)
+            report["cpu_profile"] = {"file": str(prof_path), "top": _cpu_top(profiler)}
+        if mem:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report["memory"] = {"peak_kib": round(peak / 1024, 1), "top": _mem_top(snapshot)}
+        path = REPORT_DIR / f"{name}-{stamp}.json"
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[report] {path} ({report['total_seconds']:.2f}s, {len(run['calls'])} provider calls)")
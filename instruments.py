@@ -0,0 +1,126 @@
+# instruments.py
+# Instrument registry: the one place that says which journal columns exist,
+# where each one comes from and how it is stored. Loaded from instruments.json
+# (or $INSTRUMENTS_CONFIG) so the universe can grow without code changes.
+#
+# Each instrument entry:
+#   column          journal column name (order = column order in the CSV)
+#   provider        "yahoo" or "fred" - where the daily value comes from
+#   symbol          Yahoo ticker (provider yahoo)
+#   exchange        trading calendar for the symbol (see trading_calendar.py)
+#   scale           multiplier applied to the provider value (default 1.0)
+#   precision       decimals written to the journal (default 4)
+#   fred            FRED series id: the source for provider fred, the
+#                   fallback for anything else
+#   fred_frequency  "daily" / "monthly" - sets the FRED cache TTL
+#   gbond           EODHD government bond symbol (update_global_yields.py)
+#   kind            "price" (default) or "yield"
+#   checks          validation overrides: range, max_jump, nullable
+#                   (see validation.py for the defaults per kind)
+#
+#   python instruments.py          # validate the config and list it
+import json, os, re
+from functools import lru_cache
+from pathlib import Path
+
+import trading_calendar
+
+CONFIG_PATH = Path(os.getenv("INSTRUMENTS_CONFIG", Path(__file__).with_name("instruments.json")))
+
+PROVIDERS = {"yahoo", "fred"}
+KINDS = {"price", "yield"}
+CHECK_KEYS = {"range", "max_jump", "nullable"}
+DEFAULTS = {"scale": 1.0, "precision": 4, "kind": "price"}
+
+# fetch engine defaults, overridden by the config's "fetch" block and then
+# by YF_BATCH_SIZE / YF_MAX_WORKERS in the environment
+FETCH_DEFAULTS = {"batch_size": 25, "max_workers": 4}
+
+def _validate(instruments):
+    seen = set()
+    for inst in instruments:
+        col = inst.get("column")
+        if not col or col == "date":
+            raise ValueError(f"instrument without a usable column: {inst}")
+        if col in seen:
+            raise ValueError(f"duplicate instrument column: {col}")
+        seen.add(col)
+        if inst.get("provider") not in PROVIDERS:
+            raise ValueError(f"{col}: unknown provider {inst.get('provider')!r}")
+        if inst["provider"] == "yahoo" and not inst.get("symbol"):
+            raise ValueError(f"{col}: yahoo instrument needs a symbol")
+        if inst["provider"] == "fred" and not inst.get("fred"):
+            raise ValueError(f"{col}: fred instrument needs a fred series id")
+        if inst["kind"] not in KINDS:
+            raise ValueError(f"{col}: unknown kind {inst['kind']!r}")
+        unknown = set(inst.get("checks", {})) - CHECK_KEYS
+        if unknown:
+            raise ValueError(f"{col}: unknown checks {sorted(unknown)}")
+        ex = inst.get("exchange")
+        if ex is not None and ex not in trading_calendar.HOLIDAY_RULES:
+            raise ValueError(f"{col}: unknown exchange {ex!r}")
+
+@lru_cache(maxsize=None)
+def _load(path: str):
+    with open(path) as f:
+        cfg = json.load(f)
+    instruments = tuple({**DEFAULTS, **inst} for inst in cfg.get("instruments", []))
+    _validate(instruments)
+    fetch = {**FETCH_DEFAULTS, **cfg.get("fetch", {})}
+    return instruments, fetch
+
+def load(path=None):
+    """All instrument entries (defaults filled in), in column order."""
+    return _load(str(path or CONFIG_PATH))[0]
+
+def fetch_settings(path=None) -> dict:
+    fetch = dict(_load(str(path or CONFIG_PATH))[1])
+    for key, env in (("batch_size", "YF_BATCH_SIZE"), ("max_workers", "YF_MAX_WORKERS")):
+        if os.getenv(env):
+            fetch[key] = int(os.getenv(env))
+    return fetch
+
+def headers() -> list:
+    return ["date"] + [i["column"] for i in load()]
+
+def yahoo_tickers() -> dict:
+    """{column: Yahoo symbol} for every Yahoo-sourced column."""
+    return {i["column"]: i["symbol"] for i in load() if i["provider"] == "yahoo"}
+
+def ticker_exchange() -> dict:
+    """{Yahoo symbol: exchange} for symbols with a trading calendar."""
+    return {i["symbol"]: i["exchange"] for i in load() if i.get("symbol") and i.get("exchange")}
+
+def fred_series(primary_only: bool = False) -> dict:
+    """{column: FRED series id}; primary_only keeps just the FRED-sourced columns
+    (drops series that only back up another provider, e.g. DGS10 for ^TNX)."""
+    return {i["column"]: i["fred"] for i in load()
+            if i.get("fred") and (not primary_only or i["provider"] == "fred")}
+
+def fred_frequency() -> dict:
+    """{FRED series id: frequency} for the FRED cache TTLs."""
+    return {i["fred"]: i["fred_frequency"] for i in load() if i.get("fred") and i.get("fred_frequency")}
+
+def gbond_symbols() -> dict:
+    return {i["column"]: i["gbond"] for i in load() if i.get("gbond")}
+
+def columns(kind: str | None = None) -> list:
+    return [i["column"] for i in load() if kind is None or i["kind"] == kind]
+
+def precision() -> dict:
+    return {i["column"]: i["precision"] for i in load()}
+
+def scale() -> dict:
+    return {i["column"]: i["scale"] for i in load()}
+
+def slug(col: str) -> str:
+    """File-name-safe form of a column name ("UK 10 YR (%)" -> "uk_10_yr_pct")."""
+    s = col.lower().replace("%", "pct").replace("&", "and")
+    return re.sub(r"[^a-z0-9]+", "_", s).strip("_")
+
+if __name__ == "__main__":
+    for i in load():
+        src = i.get("symbol") or i.get("fred")
+        print(f"{i['column']:20s} {i['provider']:6s} {src:16s} {i.get('exchange') or '-':7s} "
+              f"{i['precision']}dp x{i['scale']:g} {i['kind']}")
+    print(f"[ok] {len(load())} instruments, fetch {fetch_settings()}")
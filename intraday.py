@@ -0,0 +1,233 @@
+# intraday.py
+# Intraday bar ingestion: minute / hourly bars for the registry's Yahoo
+# tickers, streamed into one partition file per day:
+#
+#   data/intraday/<interval>/<YYYY-MM-DD>.csv
+#       timestamp,column,ticker,open,high,low,close,volume
+#
+# Bars are fetched a batch of tickers at a time and pass through a bounded
+# buffer (BUFFER_ROWS) that is flushed to the partition in chunks, so memory
+# stays flat however many bars a day produces. A day is written to a temp
+# file and swapped in at the end, so re-ingesting a day replaces it cleanly.
+# The daily journal is untouched; derive_row() rebuilds a day's journal row
+# from the last bar of each ticker.
+#
+#   python intraday.py ingest [DAY] [--interval 1m]
+#   python intraday.py derive DAY [--interval 1m] [--write]
+#
+# Yahoo only serves 1m bars for roughly the last 30 days (hourly: ~2 years).
+import argparse, csv, os
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import quote
+import pandas as pd
+import yfinance as yf
+
+import instrumentation
+import instruments
+import journal
+import providers
+from fetch_prices import HEADERS, YF_TICKERS, PRECISION, SCALE, YAHOO_CHART_URL
+
+INTRADAY_DIR = Path("data/intraday")
+INTERVALS = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"]
+FIELDS = ["timestamp", "column", "ticker", "open", "high", "low", "close", "volume"]
+
+# rows held in memory before a flush, and rows per chunk when reading back
+BUFFER_ROWS = 20_000
+READ_CHUNK_ROWS = 50_000
+
+def partition_path(day: date, interval: str) -> Path:
+    return INTRADAY_DIR / interval / f"{day.isoformat()}.csv"
+
+# ====== Writing ======
+class BarWriter:
+    """Bounded-buffer writer for one day partition. Rows are appended to a
+    temp file every max_rows; close() swaps it in, abort() discards it."""
+
+    def __init__(self, path: Path, max_rows: int = BUFFER_ROWS):
+        self.path = path
+        self.tmp = path.with_suffix(".csv.tmp")
+        self.max_rows = max_rows
+        self.buffer = []
+        self.rows = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.tmp, "w", newline="")
+        self.w = csv.writer(self.f)
+        self.w.writerow(FIELDS)
+
+    def add(self, rows):
+        for row in rows:
+            self.buffer.append(row)
+            if len(self.buffer) >= self.max_rows:
+                self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.w.writerows(self.buffer)
+            self.rows += len(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+# ====== Fetching ======
+def _fmt(v, dp=6):
+    return "" if v is None or pd.isna(v) else f"{float(v):.{dp}f}"
+
+def _chart_bars(ticker: str, day: date, interval: str):
+    """Bars for one ticker on day from the YAHOO_CHART_URL endpoint."""
+    epoch = lambda d: int(datetime(d.year, d.month, d.day).timestamp())
+    params = {"period1": epoch(day), "period2": epoch(day + timedelta(days=1)), "interval": interval}
+    try:
+        data = providers.get_json(f"{YAHOO_CHART_URL}/{quote(ticker, safe='')}", params)
+        res = data["chart"]["result"][0]
+    except Exception:
+        return
+    quote_ = res.get("indicators", {}).get("quote", [{}])[0]
+    n = len(res.get("timestamp", []))
+    cols = {k: quote_.get(k) or [None] * n for k in ("open", "high", "low", "close", "volume")}
+    for i, ts in enumerate(res.get("timestamp", [])):
+        if cols["close"][i] is None:
+            continue
+        stamp = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        yield stamp, cols["open"][i], cols["high"][i], cols["low"][i], cols["close"][i], cols["volume"][i]
+
+def _yf_bars(tickers, day: date, interval: str):
+    """{ticker: bar iterator} from one grouped yf.download for a batch of tickers."""
+    with instrumentation.call("yahoo", ",".join(tickers)) as rec:
+        df = yf.download(
+            tickers, start=day, end=day + timedelta(days=1), interval=interval,
+            auto_adjust=False, group_by="ticker", threads=False, progress=False,
+        )
+        rec["ok"] = df is not None and not df.empty
+    out = {}
+    if df is None or df.empty:
+        return out
+    for t in tickers:
+        if isinstance(df.columns, pd.MultiIndex):
+            if t not in df.columns.get_level_values(0):
+                continue
+            sub = df[t]
+        else:
+            sub = df
+        sub = sub.dropna(subset=["Close"])
+        idx = sub.index.tz_convert("UTC") if sub.index.tz is not None else sub.index
+        out[t] = zip((ts.isoformat() for ts in idx), sub["Open"], sub["High"],
+                     sub["Low"], sub["Close"], sub["Volume"])
+    return out
+
+def fetch_bars(tickers, day: date, interval: str, batch_size: int | None = None):
+    """Yield (ticker, bars) one ticker at a time, fetching a batch of tickers
+    per request so only one batch of responses is held at once."""
+    tickers = list(tickers)
+    batch_size = batch_size or instruments.fetch_settings()["batch_size"]
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        if YAHOO_CHART_URL:
+            for t in batch:
+                yield t, _chart_bars(t, day, interval)
+        else:
+            bars = _yf_bars(batch, day, interval)
+            for t in batch:
+                if t in bars:
+                    yield t, bars[t]
+
+def ingest(day: date, interval: str = "1m", columns=None, max_rows: int = BUFFER_ROWS) -> int:
+    """Fetch the day's bars for columns (default: every Yahoo column) into
+    its partition file. Returns the number of bars written."""
+    cols = {c: t for c, t in YF_TICKERS.items() if columns is None or c in columns}
+    by_ticker = {}
+    for c, t in cols.items():
+        by_ticker.setdefault(t, []).append(c)
+    path = partition_path(day, interval)
+    with BarWriter(path, max_rows=max_rows) as w:
+        for t, bars in fetch_bars(by_ticker, day, interval):
+            for stamp, o, h, l, c, v in bars:
+                w.add([stamp, col, t, _fmt(o), _fmt(h), _fmt(l), _fmt(c), _fmt(v, 0)]
+                      for col in by_ticker[t])
+    print(f"[intraday] {day} {interval}: {w.rows} bars -> {path}")
+    return w.rows
+
+# ====== Reading ======
+def iter_bars(day: date, interval: str = "1m", chunksize: int = READ_CHUNK_ROWS):
+    """The day's bars as DataFrames of at most chunksize rows."""
+    path = partition_path(day, interval)
+    if not path.exists():
+        return
+    yield from pd.read_csv(path, chunksize=chunksize, dtype={"column": str, "ticker": str})
+
+def daily_closes(day: date, interval: str = "1m") -> dict:
+    """{column: last bar close} for the day, read chunk by chunk."""
+    last = {}  # column -> (timestamp, close)
+    for chunk in iter_bars(day, interval):
+        chunk = chunk.dropna(subset=["close"]).sort_values("timestamp", kind="stable")
+        tail = chunk.groupby("column", sort=False).tail(1)
+        for col, ts, close in zip(tail["column"], tail["timestamp"], tail["close"]):
+            if col not in last or ts >= last[col][0]:
+                last[col] = (ts, float(close))
+    return {col: close for col, (_, close) in last.items()}
+
+def derive_row(day: date, interval: str = "1m") -> dict:
+    """A journal row for day built from the bars (Yahoo columns only; the
+    FRED-sourced yields stay empty)."""
+    row = {h: "" for h in HEADERS}
+    row["date"] = day.isoformat()
+    for col, v in daily_closes(day, interval).items():
+        if col in row:
+            row[col] = f"{v * SCALE[col]:.{PRECISION[col]}f}"
+    return row
+
+# ====== CLI ======
+def parse_args():
+    p = argparse.ArgumentParser(description="Intraday bar ingestion into day partitions.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("ingest", help="Fetch a day's bars into its partition.")
+    i.add_argument("day", nargs="?", default=date.today().isoformat())
+    i.add_argument("--interval", default="1m", choices=INTERVALS)
+    i.add_argument("--only", action="append", metavar="COLUMN", help="Columns to ingest (repeatable).")
+    d = sub.add_parser("derive", help="Build a day's journal row from its bars.")
+    d.add_argument("day")
+    d.add_argument("--interval", default="1m", choices=INTERVALS)
+    d.add_argument("--write", action="store_true",
+                   help="Upsert the derived prices into the journal (existing cells for other columns kept).")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    day = datetime.strptime(args.day, "%Y-%m-%d").date()
+    if args.cmd == "ingest":
+        ingest(day, args.interval, columns=args.only)
+        return
+    row = derive_row(day, args.interval)
+    for col in HEADERS[1:]:
+        if row[col]:
+            print(f"[derive] {args.day} {col}: {row[col]}")
+    if args.write:
+        existing = next((r for r in journal.load_rows() if r.get("date") == args.day), None)
+        if existing:
+            row = {**existing, **{k: v for k, v in row.items() if v}}
+        journal.ensure_header(HEADERS)
+        action = journal.upsert_row(HEADERS, row)
+        print(f"[{action}] {args.day} -> journal row derived from {args.interval} bars")
+
+if __name__ == "__main__":
+    with instrumentation.session("intraday"):
+        main()
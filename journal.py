@@ -0,0 +1,688 @@
+# journal.py
+# Read/write helpers for the daily journal (data/journal/, see below).
+#
+# The daily run only ever appends a row or refreshes the last one, so
+# upsert_row() edits the tail of the file in place instead of rewriting the
+# whole history. A tail edit is first recorded in a small intent file
+# (written with temp-file + rename) and replayed by recover() if the run
+# dies half-way, so the CSV is never left with a torn last row.
+#
+# A sidecar index of each column's last valid value (and its date) is kept
+# next to the CSV and updated on every upsert, so carry-forward lookups do
+# not have to scan the history. The sidecar is keyed on the sha256 of the
+# file it indexes and committed with it, so a fresh checkout (where every
+# mtime moves) only re-hashes the journal instead of re-parsing it. Digests
+# are remembered in a local stat cache (.cache/, not committed) while a
+# file's size and mtime are unchanged.
+#
+# The journal lives in month partitions, data/journal/YYYY/MM.csv (each with
+# its own last-value sidecar), described by data/journal/manifest.json. The
+# helpers below work on the partitions when called without a path: the daily
+# upsert touches only the row's month and load_range() opens only the months
+# it needs, so a daily run reads and commits one partition, its sidecar and
+# the manifest however long the history gets. A tree without the manifest
+# uses the single data/etf_prices_log.csv instead (python journal.py migrate
+# splits it).
+#
+# Writes to the journal are checked against the per-column rules in
+# validation.py first (JOURNAL_VALIDATE=warn|strict|off).
+#
+# Writes that would not change anything are skipped: upsert_row() compares
+# the new row with the one on disk, write_rows() compares the rendered file,
+# and each partition's sha256 is kept in the manifest so a rewrite of the
+# partitioned journal only touches the months whose content changed.
+# changed() lists every data file actually written by this process.
+#
+#   python journal.py migrate [--keep-csv]   # single CSV -> partitions
+#   python journal.py export [out.csv]       # partitions -> single CSV
+#   python journal.py info
+import os, io, csv, json, math, hashlib
+from datetime import date, timedelta
+from pathlib import Path
+
+CSV_PATH = Path("data/etf_prices_log.csv")
+PARTITION_DIR = Path("data/journal")
+MANIFEST_NAME = "manifest.json"
+
+DIGEST_CACHE_PATH = Path(os.getenv("JOURNAL_DIGEST_CACHE", ".cache/journal-digests.json"))
+
+TAIL_CHUNK = 4096
+PREV_LOOKBACK_DAYS = 45  # how far back an upsert looks for the previous value to validate against
+
+# data files written with new content by this process (see changed())
+_CHANGED = []
+# {path: [size, mtime_ns, sha256]} stat cache behind file_digest(), loaded on first use
+_DIGESTS = None
+
+def mark_changed(path: Path):
+    if str(path) not in _CHANGED:
+        _CHANGED.append(str(path))
+
+def changed() -> list:
+    """Data files (journal, partitions, derived tables, artifacts) written
+    with new content so far; empty when the run was a no-op."""
+    return list(_CHANGED)
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _sidecar(path: Path, suffix: str) -> Path:
+    return path.with_name(path.name + suffix)
+
+def atomic_write(path: Path, data: bytes):
+    """Write data to path via a temp file + rename (readers never see a partial file)."""
+    tmp = _sidecar(path, ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """atomic_write() unless path already holds data; a write is recorded for
+    changed(). True if written."""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, data)
+    mark_changed(path)
+    return True
+
+def format_row(headers, row) -> bytes:
+    """One CSV line exactly as csv.DictWriter would write it."""
+    buf = io.StringIO()
+    csv.writer(buf).writerow([row.get(h, "") for h in headers])
+    return buf.getvalue().encode()
+
+def ensure_header(headers, path: Path | None = None):
+    if path is None:
+        if partitioned():
+            return
+        path = CSV_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not path.exists():
+        atomic_write(path, format_row(headers, {h: h for h in headers}))
+        mark_changed(path)
+
+def load_rows(path: Path | None = None):
+    if path is None:
+        if partitioned():
+            return [r for p in files() for r in load_rows(p)]
+        path = CSV_PATH
+    if not path.exists(): return []
+    recover(path)
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def _render(headers, rows) -> bytes:
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=headers)
+    w.writeheader()
+    w.writerows(rows)
+    return buf.getvalue().encode()
+
+def write_rows(headers, rows, path: Path | None = None) -> bool:
+    """Full rewrite of the CSV (crash-safe: temp file + rename), skipped when
+    the file already holds exactly this content. Writes to the journal itself
+    (no path) are validated first. Returns True if anything was written."""
+    if path is None:
+        _validate(headers, rows)
+        if partitioned():
+            return _write_partitions(headers, rows)
+        path = CSV_PATH
+    return write_rendered(path, _render(headers, rows))
+
+def write_rendered(path: Path, data: bytes) -> bool:
+    """write_rows() for a CSV already rendered to bytes (e.g. column-wise by
+    the caller): any interrupted tail edit is settled first and the file is
+    only replaced when its content differs. Returns True if written."""
+    recover(path)
+    if path.exists() and _digest(path.read_bytes()) == _digest(data):
+        return False
+    atomic_write(path, data)
+    pending = _sidecar(path, ".pending")
+    if pending.exists():
+        pending.unlink()
+    mark_changed(path)
+    return True
+
+def read_header(path: Path | None = None):
+    if path is None:
+        if partitioned():
+            return list(read_manifest()["headers"])
+        path = CSV_PATH
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
+
+def _tail(path: Path):
+    """(offset, line) of the last non-empty line; offset 0 means it is the header."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        buf = b""
+        pos = end
+        while pos > 0:
+            step = min(TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            body = buf.rstrip(b"\r\n")
+            nl = body.rfind(b"\n")
+            if nl >= 0:
+                return pos + nl + 1, buf[nl + 1:]
+        return 0, buf
+
+def _lines_from_end(path: Path):
+    """path's lines after the header, last one first (newline stripped, blank
+    lines skipped), read backwards in TAIL_CHUNK blocks."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        rest = b""
+        while pos > 0:
+            step = min(TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + rest).split(b"\n")
+            rest = lines[0]  # partial line, or the header once pos reaches 0
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line.rstrip(b"\r")
+
+def _rows_from_end(path: Path):
+    """path's rows as dicts, last one first (see _lines_from_end)."""
+    recover(path)
+    headers = read_header(path)
+    for line in _lines_from_end(path):
+        yield dict(zip(headers, next(csv.reader([line.decode()]), [])))
+
+def tail_rows(n: int, end: str | None = None, path: Path | None = None):
+    """The last n rows dated on/before end (YYYY-MM-DD, default: the last n
+    rows), oldest first. The file is read backwards from its end - only the
+    newest months when partitioned - so the cost does not grow with the
+    history (rows are kept in date order)."""
+    if path is None:
+        if partitioned():
+            rows = []
+            for p in reversed(files(None, end)):
+                rows = tail_rows(n - len(rows), end, p) + rows
+                if len(rows) >= n:
+                    break
+            return rows
+        path = CSV_PATH
+    if n <= 0 or not path.exists():
+        return []
+    rows = []
+    for r in _rows_from_end(path):
+        d = (r.get("date") or "").strip()
+        if d and (end is None or d <= end):
+            rows.append(r)
+            if len(rows) == n:
+                break
+    rows.reverse()
+    return rows
+
+def read_last_row(path: Path | None = None):
+    """Last data row as a dict (None if the file only has a header)."""
+    if path is None:
+        if partitioned():
+            paths = files()
+            return read_last_row(paths[-1]) if paths else None
+        path = CSV_PATH
+    if not path.exists():
+        return None
+    recover(path)
+    offset, line = _tail(path)
+    if offset == 0:
+        return None
+    values = next(csv.reader([line.decode().rstrip("\r\n")]), [])
+    return dict(zip(read_header(path), values))
+
+def _apply(path: Path, offset: int, data: bytes):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+
+def recover(path: Path = CSV_PATH):
+    """Replay a tail edit left behind by an interrupted upsert_row()."""
+    pending = _sidecar(path, ".pending")
+    if not pending.exists():
+        return
+    try:
+        with open(pending) as f:
+            intent = json.load(f)
+    except (OSError, ValueError):
+        # the intent itself never landed (rename is atomic), so the CSV is untouched
+        pending.unlink()
+        return
+    _apply(path, intent["offset"], intent["data"].encode())
+    pending.unlink()
+
+def _rewrite_with(headers, row, path: Path) -> str:
+    rows = load_rows(path)
+    dstr = row.get("date", "")
+    for i, r in enumerate(rows):
+        if r.get("date") == dstr:
+            rows[i] = row
+            break
+    else:
+        rows.append(row)
+    rows.sort(key=lambda r: r.get("date", ""))
+    return "rewritten" if write_rows(headers, rows, path) else "unchanged"
+
+# ====== Validation ======
+def _validate(headers, rows, prev=None):
+    import validation
+    validation.check(headers, rows, prev)
+
+def _values_before(dstr: str) -> dict:
+    """{column: last valid value dated before dstr} for the day-over-day check
+    of an upsert, from the last-value index of the files covering the last
+    PREV_LOOKBACK_DAYS. Columns whose indexed value is on/after dstr (a
+    same-day re-run) are found by walking back from the end of the journal."""
+    start = (date.fromisoformat(dstr) - timedelta(days=PREV_LOOKBACK_DAYS)).isoformat()
+    prev, stale = {}, set()
+    for p in files(start, dstr):
+        for col, (d, v) in load_last_index(p).items():
+            if d < dstr:
+                prev[col] = v
+            else:
+                stale.add(col)
+    if stale:
+        prev.update(_scan_back(stale, start, dstr))
+    return prev
+
+def _scan_back(cols, start: str, before: str) -> dict:
+    """{column: last valid value dated in [start, before)} for cols, reading
+    rows from the end of the journal until each is found or start is passed;
+    a same-day re-run only reads the last few rows."""
+    found = {}
+    for p in reversed(files(start, before)):
+        for r in _rows_from_end(p):
+            d = (r.get("date") or "").strip()
+            if not d or d >= before:
+                continue
+            if d < start:
+                return found
+            for col in cols - found.keys():
+                v = cell_value(r.get(col))
+                if v is not None:
+                    found[col] = v
+            if len(found) == len(cols):
+                return found
+    return found
+
+# ====== Last-valid-value index ======
+def _fingerprint(path: Path):
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+def file_digest(path: Path) -> str:
+    """sha256 of path's content, reused from the local stat cache while its
+    size and mtime are unchanged (only files written since are re-read)."""
+    global _DIGESTS
+    if _DIGESTS is None:
+        try:
+            with open(DIGEST_CACHE_PATH) as f:
+                _DIGESTS = json.load(f)
+        except (OSError, ValueError):
+            _DIGESTS = {}
+    st = _fingerprint(path)
+    seen = _DIGESTS.get(str(path))
+    if seen and seen[:2] == st:
+        return seen[2]
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    _DIGESTS[str(path)] = st + [digest]
+    DIGEST_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(DIGEST_CACHE_PATH, json.dumps(_DIGESTS).encode())
+    return digest
+
+def digests(paths=None) -> dict:
+    """{path: file_digest()} of the journal files (default: all of them), for
+    derived views to tell whether the journal changed since they were built."""
+    return {str(p): file_digest(p) for p in (files() if paths is None else paths) if p.exists()}
+
+def cell_value(s):
+    """Cell as float if it holds a usable number, else None (empty,
+    unparseable and NaN cells alike)."""
+    s = (s or "").strip()
+    if not s:
+        return None
+    try:
+        v = float(s)
+    except ValueError:
+        return None
+    return None if math.isnan(v) else v
+
+def build_last_index(path: Path = CSV_PATH) -> dict:
+    """Scan the CSV once -> {column: [date, value]} for each column's last valid cell."""
+    columns = {}
+    for r in load_rows(path):
+        dstr = (r.get("date") or "").strip()
+        if not dstr:
+            continue
+        for col, s in r.items():
+            if col == "date":
+                continue
+            v = cell_value(s)
+            if v is not None and dstr >= columns.get(col, ("", None))[0]:
+                columns[col] = [dstr, v]
+    return columns
+
+def _save_last_index(path: Path, columns: dict):
+    data = json.dumps({"sha256": file_digest(path), "columns": columns}).encode()
+    write_if_changed(_sidecar(path, ".lastvalid.json"), data)
+
+def load_last_index(path: Path | None = None) -> dict:
+    """{column: [date, value]}, from the sidecar when it matches the CSV, else rebuilt."""
+    if path is None:
+        if partitioned():
+            merged = {}
+            for p in files():
+                for col, entry in load_last_index(p).items():
+                    if col not in merged or entry[0] >= merged[col][0]:
+                        merged[col] = entry
+            return merged
+        path = CSV_PATH
+    recover(path)
+    try:
+        with open(_sidecar(path, ".lastvalid.json")) as f:
+            index = json.load(f)
+        if index.get("sha256") == file_digest(path):
+            return index["columns"]
+    except (OSError, ValueError):
+        pass
+    columns = build_last_index(path)
+    _save_last_index(path, columns)
+    return columns
+
+def _update_last_index(path: Path, row: dict, before):
+    """Fold a just-written row into the sidecar (before = file_digest() prior to the write)."""
+    side = _sidecar(path, ".lastvalid.json")
+    try:
+        with open(side) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return
+    columns = index.get("columns", {})
+    if index.get("sha256") != before:
+        side.unlink()
+        return
+    dstr = row.get("date", "")
+    for col, s in row.items():
+        if col == "date":
+            continue
+        v = cell_value(s)
+        prev = columns.get(col)
+        if v is not None:
+            if prev is None or dstr >= prev[0]:
+                columns[col] = [dstr, v]
+        elif prev is not None and prev[0] == dstr:
+            # the cell this entry pointed at was cleared; rebuild on next use
+            side.unlink()
+            return
+    _save_last_index(path, columns)
+
+def last_known_value(col: str, before_date, path: Path | None = None):
+    """Most recent valid value of col dated strictly before before_date (float or None)."""
+    before = before_date if isinstance(before_date, str) else before_date.isoformat()
+    if path is None:
+        if partitioned():
+            # newest month first; months after before_date can't hold the answer
+            for key in sorted(read_manifest()["partitions"], reverse=True):
+                if key > before[:7]:
+                    continue
+                v = last_known_value(col, before, partition_path(key))
+                if v is not None:
+                    return v
+            return None
+        path = CSV_PATH
+    if not path.exists():
+        return None
+    entry = load_last_index(path).get(col)
+    if entry is None:
+        return None
+    if entry[0] < before:
+        return entry[1]
+    # the latest value is on/after before_date (a same-day re-run, or an
+    # older date being filled): walk back from the end of the file
+    for r in _rows_from_end(path):
+        dstr = (r.get("date") or "").strip()
+        v = cell_value(r.get(col))
+        if dstr and dstr < before and v is not None:
+            return v
+    return None
+
+def upsert_row(headers, row, path: Path | None = None) -> str:
+    """Add or update the row for row["date"].
+
+    Appends when the date is after the last row and rewrites just the last
+    line when it is the same date. Anything else (new header, a row landing
+    before the tail) falls back to a full rewrite - of just the row's month
+    when the journal is partitioned.
+    Returns "added", "updated", "rewritten" or "unchanged" (the row on disk
+    already had this content, nothing was written).
+    """
+    if path is None:
+        _validate(headers, [row], _values_before(row.get("date", "")))
+        if partitioned():
+            return _upsert_partition(headers, row)
+        path = CSV_PATH
+    ensure_header(headers, path)
+    recover(path)
+    if read_header(path) != list(headers):
+        return _rewrite_with(headers, row, path)
+
+    offset, line = _tail(path)
+    dstr = row.get("date", "")
+    if offset == 0:
+        last_date = None
+    else:
+        last_date = line.split(b",", 1)[0].decode().strip()
+    if last_date is None or last_date < dstr:
+        if not line.endswith(b"\n"):
+            return _rewrite_with(headers, row, path)
+        offset, action = offset + len(line), "added"
+    elif last_date == dstr:
+        action = "updated"
+    else:
+        return _rewrite_with(headers, row, path)
+
+    data = format_row(headers, row)
+    if action == "updated" and _digest(data) == _digest(line):
+        return "unchanged"
+    before = file_digest(path) if _sidecar(path, ".lastvalid.json").exists() else None
+    pending = _sidecar(path, ".pending")
+    atomic_write(pending, json.dumps({"offset": offset, "data": data.decode()}).encode())
+    _apply(path, offset, data)
+    pending.unlink()
+    _update_last_index(path, row, before)
+    mark_changed(path)
+    return action
+
+def _merge_by_date(existing, rows):
+    """existing rows with rows added / replaced by date, in date order."""
+    by_date = {r.get("date", ""): r for r in existing}
+    by_date.update((r["date"], r) for r in rows)
+    return [by_date[d] for d in sorted(by_date)]
+
+def upsert_rows(headers, rows, path: Path | None = None) -> bool:
+    """Add or replace many rows by date with one rewrite per file touched:
+    the single CSV, or just the months the rows fall in when partitioned.
+    Returns True if anything was written."""
+    rows = [r for r in rows if (r.get("date") or "").strip()]
+    if not rows:
+        return False
+    if path is None:
+        _validate(headers, rows, _values_before(min(r["date"] for r in rows)))
+        if partitioned():
+            return _upsert_partitions(headers, rows)
+        path = CSV_PATH
+    return write_rows(headers, _merge_by_date(load_rows(path), rows), path)
+
+# ====== Month partitions ======
+def manifest_path(root: Path = PARTITION_DIR) -> Path:
+    return root / MANIFEST_NAME
+
+def partitioned(root: Path = PARTITION_DIR) -> bool:
+    return manifest_path(root).exists()
+
+def partition_key(dstr: str) -> str:
+    """YYYY-MM partition a YYYY-MM-DD date belongs to."""
+    return dstr.strip()[:7]
+
+def partition_path(key: str, root: Path = PARTITION_DIR) -> Path:
+    year, month = key.split("-")
+    return root / year / f"{month}.csv"
+
+def read_manifest(root: Path = PARTITION_DIR) -> dict:
+    with open(manifest_path(root)) as f:
+        return json.load(f)
+
+def _write_manifest(manifest: dict, root: Path = PARTITION_DIR):
+    root.mkdir(parents=True, exist_ok=True)
+    manifest["partitions"] = dict(sorted(manifest["partitions"].items()))
+    write_if_changed(manifest_path(root), (json.dumps(manifest, indent=2) + "\n").encode())
+
+def _partition_entry(key: str, rows, root: Path = PARTITION_DIR, sha256: str | None = None) -> dict:
+    dates = [r.get("date", "") for r in rows if r.get("date")]
+    return {
+        "path": partition_path(key, root).relative_to(root).as_posix(),
+        "rows": len(dates),
+        "first": min(dates) if dates else None,
+        "last": max(dates) if dates else None,
+        "sha256": sha256 or _digest(partition_path(key, root).read_bytes()),
+    }
+
+def files(start: str | None = None, end: str | None = None, root: Path = PARTITION_DIR):
+    """Journal files in date order: the partitions overlapping [start, end]
+    (YYYY-MM-DD, either open) or the single CSV when not partitioned."""
+    if not partitioned(root):
+        return [CSV_PATH] if CSV_PATH.exists() else []
+    keys = read_manifest(root)["partitions"]
+    lo = partition_key(start) if start else ""
+    hi = partition_key(end) if end else "9999-99"
+    return [partition_path(k, root) for k in sorted(keys) if lo <= k <= hi]
+
+def load_range(start: str | None = None, end: str | None = None):
+    """Rows dated within [start, end] (YYYY-MM-DD, inclusive, either open);
+    partitions outside the range are never opened."""
+    rows = []
+    for p in files(start, end):
+        for r in load_rows(p):
+            d = (r.get("date") or "").strip()
+            if d and (start is None or d >= start) and (end is None or d <= end):
+                rows.append(r)
+    return rows
+
+def _write_partitions(headers, rows, root: Path = PARTITION_DIR) -> bool:
+    """Full rewrite of the partitioned journal; months no longer present are
+    removed. Months whose content digest matches the manifest are not
+    touched. Returns True if any partition changed."""
+    groups = {}
+    for r in sorted(rows, key=lambda r: r.get("date", "")):
+        d = (r.get("date") or "").strip()
+        if d:
+            groups.setdefault(partition_key(d), []).append(r)
+    old = read_manifest(root)["partitions"] if partitioned(root) else {}
+    entries, touched = {}, False
+    for key, group in groups.items():
+        p = partition_path(key, root)
+        data = _render(headers, group)
+        digest = _digest(data)
+        if old.get(key, {}).get("sha256") != digest or not p.exists():
+            p.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(p, data)
+            _sidecar(p, ".pending").unlink(missing_ok=True)
+            mark_changed(p)
+            touched = True
+        entries[key] = _partition_entry(key, group, root, digest)
+    for key in set(old) - set(groups):
+        partition_path(key, root).unlink(missing_ok=True)
+        mark_changed(partition_path(key, root))
+        touched = True
+    _write_manifest({"headers": list(headers), "partitions": entries}, root)
+    return touched
+
+def _upsert_partition(headers, row, root: Path = PARTITION_DIR) -> str:
+    """upsert_row() against the row's month partition only."""
+    key = partition_key(row.get("date", ""))
+    p = partition_path(key, root)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(root)
+    entry = manifest["partitions"].get(key)
+    action = upsert_row(headers, row, p)
+    if action == "unchanged" and entry is not None:
+        return action
+    dstr = row["date"]
+    if entry is None or action == "rewritten":
+        entry = _partition_entry(key, load_rows(p), root)
+    else:
+        entry["rows"] += action == "added"
+        entry["first"] = min(filter(None, [entry.get("first"), dstr]))
+        entry["last"] = max(filter(None, [entry.get("last"), dstr]))
+        entry["sha256"] = _digest(p.read_bytes())
+    manifest["partitions"][key] = entry
+    manifest["headers"] = list(headers)
+    _write_manifest(manifest, root)
+    return action
+
+def _upsert_partitions(headers, rows, root: Path = PARTITION_DIR) -> bool:
+    """upsert_rows() against the months the rows fall in only."""
+    groups = {}
+    for r in rows:
+        groups.setdefault(partition_key(r["date"]), []).append(r)
+    manifest = read_manifest(root)
+    touched = False
+    for key, group in sorted(groups.items()):
+        p = partition_path(key, root)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        merged = _merge_by_date(load_rows(p), group)
+        touched |= write_rows(headers, merged, p)
+        manifest["partitions"][key] = _partition_entry(key, merged, root)
+    manifest["headers"] = list(headers)
+    _write_manifest(manifest, root)
+    return touched
+
+def migrate(keep_csv: bool = False, root: Path = PARTITION_DIR):
+    """Split the single CSV into month partitions (+ manifest)."""
+    if partitioned(root):
+        print(f"[info] already partitioned: {manifest_path(root)}")
+        return
+    if not CSV_PATH.exists():
+        print(f"[error] CSV not found: {CSV_PATH}")
+        return
+    headers = read_header(CSV_PATH)
+    rows = load_rows(CSV_PATH)
+    _write_partitions(headers, rows, root)
+    print(f"[migrate] {len(rows)} rows -> {len(read_manifest(root)['partitions'])} partitions under {root}")
+    if not keep_csv:
+        CSV_PATH.unlink()
+        for suffix in (".lastvalid.json", ".pending"):
+            _sidecar(CSV_PATH, suffix).unlink(missing_ok=True)
+        print(f"[migrate] removed {CSV_PATH}")
+
+def export(out: Path = CSV_PATH):
+    """Write the whole journal as one CSV (e.g. for tools that want the flat file)."""
+    write_rows(read_header(), load_rows(), out)
+    print(f"[export] wrote {out}")
+
+if __name__ == "__main__":
+    import sys
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if cmd == "migrate":
+        migrate(keep_csv="--keep-csv" in sys.argv[2:])
+    elif cmd == "export":
+        export(Path(sys.argv[2]) if len(sys.argv) > 2 else CSV_PATH)
+    elif partitioned():
+        m = read_manifest()
+        total = sum(e["rows"] for e in m["partitions"].values())
+        print(f"[info] partitioned: {len(m['partitions'])} months, {total} rows, {len(m['headers'])} columns")
+    else:
+        print(f"[info] single file: {CSV_PATH}")
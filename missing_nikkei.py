@@ -1,10 +1,10 @@
 # patch_missing_nikkei.py
-import csv
-from pathlib import Path
 from datetime import datetime, timedelta
 import yfinance as yf
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+import journal
+
+CSV_PATH = journal.CSV_PATH
 COL = "NIKKEI"
 
 def get_close(ticker, d):
@@ -19,9 +19,8 @@ def get_close(ticker, d):
     return None
 
 def main():
-    with open(CSV_PATH, newline="") as f:
-        rows = list(csv.DictReader(f))
-        headers = f.fieldnames
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     fixed = 0
     for r in rows:
@@ -33,13 +32,12 @@ def main():
                 fixed += 1
 
     if fixed:
-        with open(CSV_PATH, "w", newline="") as f:
-            w = csv.DictWriter(f, fieldnames=headers)
-            w.writeheader()
-            w.writerows(rows)
+        journal.write_rows(headers, rows)
         print(f"[done] Filled {fixed} missing NIKKEI values.")
     else:
         print("[info] No missing NIKKEI values filled.")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("missing_nikkei"):
+        main()
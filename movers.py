@@ -0,0 +1,187 @@
+# movers.py
+# What moved today: each column's daily change scored against its own recent
+# history, for the market blurb on the site.
+#
+#   change   percent change for prices, change in percentage points for yields
+#   z        (change - mean) / stdev of the previous WINDOW changes
+#
+# Everything runs on a dates x columns float matrix with cumulative sums, so
+# scoring every column over the whole history is a handful of array passes.
+# The summary (top movers by |z|, outliers past Z_OUTLIER, a one-line blurb)
+# is written to data/artifacts/movers.json at the end of fetch_prices.
+# --all-history reads the matrix straight from the columnar store
+# (columnar.py) instead of parsing the whole CSV.
+#
+#   python movers.py [DATE] [--top N] [--window N] [--all-history]
+import argparse, json
+import numpy as np
+
+import artifacts
+import columnar
+import instruments
+import journal
+
+WINDOW = 60        # changes in the rolling baseline
+MIN_OBS = 20       # fewer baseline changes than this -> no z-score
+TOP_N = 5
+Z_OUTLIER = 3.0
+MOVERS_NAME = "movers.json"
+
+def matrix(rows, headers):
+    """(dates, values) from journal rows: a datetime64[D] array and a
+    len(rows) x len(headers)-1 float array (NaN for empty cells)."""
+    rows = sorted((r for r in rows if (r.get("date") or "").strip()), key=lambda r: r["date"])
+    dates = np.array([r["date"].strip() for r in rows], dtype="datetime64[D]")
+    values = np.array([[journal.cell_value(r.get(h)) for h in headers[1:]] for r in rows],
+                      dtype=np.float64).reshape(len(rows), len(headers) - 1)
+    return dates, values
+
+def changes(values: np.ndarray, is_yield: np.ndarray) -> np.ndarray:
+    """Day-over-day change per column: pct for prices, absolute for yields.
+    Row 0 and any pair with a missing side are NaN."""
+    out = np.full(values.shape, np.nan)
+    prev, cur = values[:-1], values[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (cur / prev - 1.0) * 100.0
+    out[1:] = np.where(is_yield, cur - prev, pct)
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+def _window_sum(a: np.ndarray, window: int) -> np.ndarray:
+    """Per row, the column sums over the window rows before it (fewer at the
+    start): one cumulative sum and a shifted subtraction."""
+    c = np.zeros((a.shape[0] + 1, a.shape[1]))
+    np.cumsum(a, axis=0, out=c[1:])
+    out = c[:-1].copy()                    # rows [0, end) for end < window
+    if a.shape[0] > window:
+        out[window:] -= c[:a.shape[0] - window]
+    return out
+
+def zscores(chg: np.ndarray, window: int = WINDOW, min_obs: int = MIN_OBS):
+    """(z, mean, std) of each change against the window changes before it
+    (the day itself is excluded from its own baseline)."""
+    ok = ~np.isnan(chg)
+    x = np.where(ok, chg, 0.0)
+    n, s, q = (_window_sum(a, window) for a in (ok.astype(np.float64), x, x * x))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s / n
+        var = (q - s * mean) / (n - 1)
+        std = np.sqrt(np.maximum(var, 0.0))
+        z = (chg - mean) / std
+    bad = (n < min_obs) | ~(std > 0) | ~ok
+    z[bad] = np.nan
+    return z, mean, std
+
+def store_matrix(headers):
+    """(dates, values) as matrix() returns them, for the whole journal, from
+    the memory-mapped columnar store (rebuilt first if stale)."""
+    dates, data = columnar.load(headers[1:])
+    values = np.empty((len(dates), len(headers) - 1))
+    for j, col in enumerate(headers[1:]):
+        values[:, j] = data[col]
+    return np.asarray(dates), values
+
+def score(rows, headers, window: int = WINDOW):
+    """(dates, values, change, z) for the rows, every column scored."""
+    return score_matrix(*matrix(rows, headers), headers, window)
+
+def score_matrix(dates, values, headers, window: int = WINDOW):
+    """score() on an already built (dates, values) matrix."""
+    yields = set(instruments.columns("yield"))
+    is_yield = np.array([c in yields for c in headers[1:]])
+    chg = changes(values, is_yield)
+    z, _, _ = zscores(chg, window)
+    return dates, values, chg, z
+
+def _entry(col, value, chg, z, is_yield, dp):
+    return {
+        "column": col,
+        "value": round(float(value), dp),
+        "change": round(float(chg), 4),
+        "unit": "pp" if is_yield else "%",
+        "z": round(float(z), 2),
+    }
+
+def _blurb(top) -> str:
+    if not top:
+        return "Quiet day: no unusual moves."
+    parts = [f"{m['column']} {'up' if m['change'] > 0 else 'down'} "
+             f"{abs(m['change']):.2f}{m['unit']} ({m['z']:+.1f}σ)" for m in top[:3]]
+    return "Biggest moves: " + "; ".join(parts) + "."
+
+def summarize(dates, values, chg, z, headers, on: str | None = None, top: int = TOP_N,
+              threshold: float = Z_OUTLIER, window: int = WINDOW) -> dict:
+    """Top movers and outliers on date on (default: the last row)."""
+    if len(dates) == 0:
+        return {"date": None, "top": [], "outliers": [], "blurb": ""}
+    i = len(dates) - 1 if on is None else int(np.searchsorted(dates, np.datetime64(on), side="right")) - 1
+    if i < 0:
+        raise ValueError(f"no journal row on or before {on}")
+    cols = headers[1:]
+    yields = set(instruments.columns("yield"))
+    precision = instruments.precision()
+    zi = z[i]
+    scored = np.flatnonzero(~np.isnan(zi))
+    order = scored[np.argsort(-np.abs(zi[scored]), kind="stable")]
+    entries = [_entry(cols[j], values[i, j], chg[i, j], zi[j], cols[j] in yields,
+                      precision.get(cols[j], 4)) for j in order]
+    top_movers = entries[:top]
+    return {
+        "date": str(dates[i]),
+        "scored": len(entries),
+        "window": window,
+        "top": top_movers,
+        "outliers": [e for e in entries if abs(e["z"]) >= threshold],
+        "blurb": _blurb(top_movers),
+    }
+
+def outlier_history(dates, chg, z, headers, threshold: float = Z_OUTLIER) -> list:
+    """Every (date, column, change, z) past threshold over the whole history."""
+    hit_rows, hit_cols = np.nonzero(np.abs(np.nan_to_num(z)) >= threshold)
+    cols = headers[1:]
+    return [{"date": str(dates[r]), "column": cols[c], "change": round(float(chg[r, c]), 4),
+             "z": round(float(z[r, c]), 2)} for r, c in zip(hit_rows, hit_cols)]
+
+def _recent_rows(window: int, on: str | None):
+    """The trailing rows needed to score date on (twice the window), read
+    from the end of the journal."""
+    return journal.tail_rows(2 * window + 1, end=on)
+
+def build(rows=None, headers=None, out_dir=artifacts.ARTIFACT_DIR, on: str | None = None,
+          window: int = WINDOW, top: int = TOP_N) -> dict:
+    """Score the latest day (or on) and write out_dir/movers.json; returns the summary."""
+    headers = headers or journal.read_header()
+    rows = _recent_rows(window, on) if rows is None else rows
+    dates, values, chg, z = score(rows, headers, window)
+    summary = summarize(dates, values, chg, z, headers, on=on, top=top, window=window)
+    data = (json.dumps(summary, indent=2, ensure_ascii=False) + "\n").encode()
+    written = journal.write_if_changed(out_dir / MOVERS_NAME, data)
+    print(f"[movers] {summary['date']}: {summary['blurb']}"
+          f"{'' if written else ' (unchanged)'}")
+    return summary
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Daily movers and outliers by rolling z-score.")
+    p.add_argument("date", nargs="?", help="YYYY-MM-DD (default: last journal row)")
+    p.add_argument("--top", type=int, default=TOP_N)
+    p.add_argument("--window", type=int, default=WINDOW)
+    p.add_argument("--all-history", action="store_true",
+                   help=f"List every |z| >= {Z_OUTLIER} over the full journal instead.")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    if not args.all_history:
+        build(on=args.date, window=args.window, top=args.top)
+        return
+    headers = journal.read_header()
+    dates, _, chg, z = score_matrix(*store_matrix(headers), headers, args.window)
+    hits = outlier_history(dates, chg, z, headers)
+    for h in hits:
+        print(f"{h['date']} {h['column']:20s} {h['change']:+10.4f} z={h['z']:+.2f}")
+    print(f"[ok] {len(hits)} outlier(s) over {len(dates)} rows")
+
+if __name__ == "__main__":
+    import instrumentation
+    with instrumentation.session("movers"):
+        main()
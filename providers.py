@@ -0,0 +1,126 @@
+# providers.py
+# Pooled HTTP client for the JSON providers (FRED, EODHD).
+#
+# One requests.Session (one keep-alive connection pool) per host, so repeat
+# calls skip the TCP/TLS handshake, and an asyncio front end that runs many
+# requests at once under a concurrency limit with per-provider timeouts:
+#
+#   results = fetch_all_json([(url, params), (url, params), ...])
+#
+# Blocking requests calls run on a worker pool sized to the concurrency
+# limit, which keeps the client on the same requests stack as the rest of
+# the repo. Throttled (429) and 5xx responses are retried with backoff.
+import asyncio, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+
+MAX_CONCURRENCY = int(os.getenv("PROVIDER_CONCURRENCY", "8"))
+
+# seconds per request, keyed by provider
+TIMEOUTS = {
+    "fred":  30,
+    "eodhd": 30,
+}
+DEFAULT_TIMEOUT = 30
+
+# extra attempts after a 429 / 5xx / connection error, and the base backoff
+# in seconds (doubled per attempt; a Retry-After header wins)
+RETRIES = int(os.getenv("PROVIDER_RETRIES", "2"))
+BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+PROVIDER_HOSTS = {
+    "api.stlouisfed.org": "fred",
+    "eodhd.com":          "eodhd",
+    "query1.finance.yahoo.com": "yahoo",
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def provider_for(url: str) -> str:
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if host in PROVIDER_HOSTS:
+        return PROVIDER_HOSTS[host]
+    # replay_server.py stand-in: http://host:port/<provider>/...
+    prefix = parts.path.lstrip("/").split("/", 1)[0]
+    return prefix if prefix in PROVIDER_HOSTS.values() else host
+
+def session_for(url: str) -> requests.Session:
+    """The shared keep-alive session for url's host (created on first use)."""
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _sessions[host] = s
+        return s
+
+def _target(url: str, params) -> str:
+    """What a call asked for, for the run report: a series id or the last path segment."""
+    if params and params.get("series_id"):
+        return params["series_id"]
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+def _retry_delay(resp, attempt: int) -> float:
+    try:
+        return float(resp.headers["Retry-After"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return BACKOFF * 2 ** attempt
+
+def get_json(url: str, params=None, timeout=None, verify: bool = True):
+    """Blocking GET through the host's pooled session; raises on HTTP errors."""
+    provider = provider_for(url)
+    if timeout is None:
+        timeout = TIMEOUTS.get(provider, DEFAULT_TIMEOUT)
+    with instrumentation.call(provider, _target(url, params)) as rec:
+        for attempt in range(RETRIES + 1):
+            rec["retries"] = attempt
+            resp = None
+            try:
+                resp = session_for(url).get(url, params=params, timeout=timeout, verify=verify)
+            except requests.ConnectionError:
+                if attempt == RETRIES:
+                    raise
+            if resp is not None and (resp.status_code not in RETRY_STATUS or attempt == RETRIES):
+                break
+            time.sleep(_retry_delay(resp, attempt))
+        rec["bytes"] = len(resp.content)
+        resp.raise_for_status()
+        return resp.json()
+
+async def get_json_async(url: str, params=None, sem: asyncio.Semaphore | None = None,
+                         timeout=None, verify: bool = True, executor=None):
+    call = partial(get_json, url, params, timeout, verify)
+    loop = asyncio.get_running_loop()
+    if sem is None:
+        return await loop.run_in_executor(executor, call)
+    async with sem:
+        return await loop.run_in_executor(executor, call)
+
+async def gather_json(calls, concurrency: int = MAX_CONCURRENCY, verify: bool = True):
+    """Run every (url, params) call concurrently; returns results in call order,
+    with the exception object in place of any call that failed."""
+    sem = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return await asyncio.gather(
+            *(get_json_async(url, params, sem, verify=verify, executor=executor)
+              for url, params in calls),
+            return_exceptions=True,
+        )
+
+def fetch_all_json(calls, concurrency: int = MAX_CONCURRENCY, verify: bool = True):
+    """Synchronous entry point for scripts: gather_json under asyncio.run."""
+    calls = list(calls)
+    if not calls:
+        return []
+    return asyncio.run(gather_json(calls, concurrency=concurrency, verify=verify))
@@ -1,16 +1,15 @@
 # reformat_yields_4dp.py
-import csv
-from pathlib import Path
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+import journal
+
+CSV_PATH = journal.CSV_PATH
 COLS = ["JAPAN 10 YR (%)", "GERMAN 10 YR (%)", "UK 10 YR (%)"]
 
 def main():
-    if not CSV_PATH.exists():
+    if not journal.files():
         print("CSV not found:", CSV_PATH); return
-    with open(CSV_PATH, newline="") as f:
-        rows = list(csv.DictReader(f))
-        headers = f.fieldnames
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     changed = 0
     for r in rows:
@@ -23,11 +22,10 @@ def main():
                 except:
                     pass
 
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
+    journal.write_rows(headers, rows)
     print(f"Reformatted {changed} values to 4dp.")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("reformat_yields"):
+        main()
@@ -0,0 +1,159 @@
+# repair_journal.py
+# Single-pass repair engine for the journal (journal.py).
+#
+# Loads the journal once, applies the declared RULES column-wise (pandas /
+# numpy, no per-row Python loops), shows a diff of changed cells and writes
+# the file once. Covers what fix_missing_nikkei.py, backfill_yields_after_917.py,
+# fill_missing_yields.py, repair_yields.py and reformat_yields.py each did
+# with their own parse/rewrite cycle.
+#
+#   python repair_journal.py --dry-run        # show the diff, write nothing
+#   python repair_journal.py                  # apply all rules
+#   python repair_journal.py --only nikkei    # apply selected rules
+import argparse
+import numpy as np
+import pandas as pd
+
+import fred_cache
+import instrumentation
+import instruments
+import journal
+from journal import CSV_PATH, write_rows
+
+YIELD_COLS = instruments.columns("yield")
+PRECISION = instruments.precision()  # decimals for filled cells (round rules override)
+
+# Longest gap (in journal rows) a carry-forward may bridge: enough for an
+# exchange holiday (Golden Week, New Year), not for a feed that went missing
+FFILL_LIMIT = 3
+
+# Applied in order. ops:
+#   asof  - fill missing cells from a FRED series (latest observation on/before
+#           the row date, at most lookback_days old)
+#   ffill - carry the last valid value forward into gaps of at most `limit`
+#           missing cells; longer gaps are left empty
+#   round - normalize every numeric cell to `decimals` places
+RULES = [
+    {"name": "fred-yields", "op": "asof", "lookback_days": 90, "series": instruments.fred_series()},
+    {"name": "carry-yields", "op": "ffill", "columns": YIELD_COLS, "limit": FFILL_LIMIT},
+    {"name": "nikkei", "op": "ffill", "columns": ["NIKKEI"], "limit": FFILL_LIMIT},
+    {"name": "format-yields", "op": "round", "columns": YIELD_COLS, "decimals": 4},
+]
+
+def load_journal():
+    """(raw strings frame sorted by date, numeric frame, parsed dates)."""
+    paths = journal.files()
+    for p in paths:
+        journal.recover(p)  # replay an interrupted tail edit before reading the file
+    parts = [pd.read_csv(p, dtype=str, keep_default_na=False) for p in paths]
+    raw = pd.concat(parts, ignore_index=True).fillna("") if parts else pd.DataFrame(columns=["date"])
+    raw = raw[raw["date"].str.strip() != ""]
+    raw = raw.sort_values("date", kind="stable").reset_index(drop=True)
+    num = raw.drop(columns="date").apply(pd.to_numeric, errors="coerce")
+    dates = pd.to_datetime(raw["date"].str.strip())
+    return raw, num, dates
+
+def _rule_asof(num, dates, rule):
+    lookback = pd.Timedelta(days=rule.get("lookback_days", 90))
+    start = (dates.min() - lookback).date()
+    end = dates.max().date()
+    left = pd.DataFrame({"date": dates.values, "pos": np.arange(len(dates))})
+    for col, sid in rule["series"].items():
+        if col not in num:
+            continue
+        missing = num[col].isna().to_numpy()
+        if not missing.any():
+            continue
+        try:
+            obs = fred_cache.observations(sid, start, end)
+        except Exception as e:
+            print(f"[warn] FRED fetch failed for {sid}: {e}")
+            continue
+        if not obs:
+            continue
+        right = pd.DataFrame({
+            "date": pd.to_datetime([d for d, _ in obs]),
+            "value": [v for _, v in obs],
+        })
+        joined = pd.merge_asof(left, right, on="date", direction="backward", tolerance=lookback)
+        vals = joined.sort_values("pos")["value"].to_numpy()
+        num.loc[missing, col] = vals[missing]
+
+def _rule_ffill(num, dates, rule):
+    for col in (c for c in rule["columns"] if c in num):
+        gap = num[col].isna()
+        # each valid cell and the gap after it form one group: size - 1 = gap length
+        run = gap.groupby((~gap).cumsum()).transform("size") - 1
+        fill = gap & (run <= rule["limit"])
+        num.loc[fill, col] = num[col].ffill()[fill]
+
+OPS = {"asof": _rule_asof, "ffill": _rule_ffill}
+
+def render(raw, num, rules):
+    """New string frame: changed cells and round-rule columns re-formatted, rest untouched."""
+    decimals = {}
+    for rule in rules:
+        if rule["op"] == "round":
+            for c in rule["columns"]:
+                decimals[c] = rule["decimals"]
+    out = raw.copy()
+    for col in num.columns:
+        new = num[col].to_numpy(dtype=float)
+        old = pd.to_numeric(raw[col], errors="coerce").to_numpy(dtype=float)
+        present = ~np.isnan(new)
+        changed = present & ~(new == old)
+        target = present if col in decimals else changed
+        if target.any():
+            dp = decimals.get(col, PRECISION.get(col, 4))
+            out.loc[target, col] = np.char.mod(f"%.{dp}f", new[target])
+    return out
+
+def diff(raw, out):
+    """[(date, column, old, new)] for every cell whose text changed."""
+    cols = [c for c in raw.columns if c != "date"]
+    a, b = raw[cols].to_numpy(), out[cols].to_numpy()
+    rows, idx = np.nonzero(a != b)
+    return [(raw.at[r, "date"], cols[c], a[r, c], b[r, c]) for r, c in zip(rows, idx)]
+
+def run(rules=RULES, dry_run=False):
+    if not journal.files():
+        print(f"[error] CSV not found: {CSV_PATH}")
+        return []
+    with instrumentation.stage("load"):
+        raw, num, dates = load_journal()
+    for rule in rules:
+        op = OPS.get(rule["op"])
+        if op is not None:
+            with instrumentation.stage(f"rule:{rule['name']}"):
+                op(num, dates, rule)
+    with instrumentation.stage("render"):
+        out = render(raw, num, rules)
+        changes = diff(raw, out)
+
+    for dstr, col, old, new in changes:
+        print(f"[{'would ' if dry_run else ''}update] {dstr} {col}: {old} -> {new}")
+    if not changes:
+        print("[info] No changes needed")
+    elif dry_run:
+        print(f"[dry-run] {len(changes)} cells would change; nothing written")
+    else:
+        with instrumentation.stage("write"):
+            write_rows(list(out.columns), out.to_dict("records"))
+        print(f"[done] Updated {len(changes)} cells in the journal")
+    return changes
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Apply journal repair rules in one pass.")
+    p.add_argument("--dry-run", action="store_true", help="Print the diff without writing.")
+    p.add_argument("--only", action="append", metavar="RULE",
+                   help=f"Rule name to apply (repeatable): {', '.join(r['name'] for r in RULES)}")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    rules = RULES if not args.only else [r for r in RULES if r["name"] in args.only]
+    run(rules, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    with instrumentation.session("repair_journal"):
+        main()
@@ -1,57 +1,28 @@
 # repair_yields.py
-import os, csv
-from pathlib import Path
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 
-CSV_PATH = Path("data/etf_prices_log.csv")
+import columnar
+import fred_cache
+import instruments
+import journal
 
-NEEDED_COLS = [
-    "US 10 YR (%)",
-    "GERMAN 10 YR (%)",
-    "UK 10 YR (%)",
-    "JAPAN 10 YR (%)",
-]
+CSV_PATH = journal.CSV_PATH
 
-FRED_KEY = os.getenv("FRED_API_KEY")
-fred = None
-if FRED_KEY:
-    try:
-        from fredapi import Fred
-        fred = Fred(api_key=FRED_KEY)
-    except Exception as e:
-        print("[warn] fredapi not available:", e)
-
-SERIES = {
-    "US 10 YR (%)":  "DGS10",             # daily
-    "GERMAN 10 YR (%)": "IRLTLT01DEM156N",# monthly
-    "UK 10 YR (%)":     "IRLTLT01GBM156N",# monthly
-    "JAPAN 10 YR (%)":  "IRLTLT01JPM156N",# monthly
-}
+# yield columns and their FRED series, from the instrument registry
+NEEDED_COLS = instruments.columns("yield")
+SERIES = instruments.fred_series()
 
 def iso(s:str)->date:
     return datetime.strptime(s.strip(), "%Y-%m-%d").date()
 
-def latest_leq(series_id: str, d: date):
-    if not fred: return None
-    try:
-        start = d - timedelta(days=90)
-        s = fred.get_series(series_id, observation_start=start, observation_end=d)
-        if s is not None:
-            s = s.dropna()
-            if len(s) > 0:
-                return float(s.iloc[-1])
-    except Exception as e:
-        print(f"[warn] FRED fetch failed for {series_id} @ {d}: {e}")
-    return None
+latest_leq = fred_cache.fred_latest_leq
 
 def main():
-    if not CSV_PATH.exists():
+    if not journal.files():
         print("[error] CSV not found:", CSV_PATH); return
 
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames or []
-        rows = list(reader)
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     # sanity: ensure needed columns exist in header; add if missing
     changed_header = False
@@ -83,12 +54,15 @@ def main():
     if fills == 0 and not changed_header:
         print("[info] No missing yields to fill (or FRED unavailable)."); return
 
-    with open(CSV_PATH, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
+    before = journal.digests()
+    journal.write_rows(headers, rows)
+    # only the yield columns changed: rewrite just those in the columnar store
+    columnar.update_columns(headers, rows, NEEDED_COLS, before)
 
     print(f"[done] Wrote CSV. Filled values: {fills}. Header changed: {changed_header}")
+    print(f"[cache] FRED {fred_cache.summary()}")
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    with instrumentation.session("repair_yields"):
+        main()
@@ -0,0 +1,267 @@
+# replay_server.py
+# Local stand-in for the Yahoo chart, FRED and EODHD endpoints, so fetch
+# performance can be measured and reproduced with no network.
+#
+#   python replay_server.py record                  # proxy to the real APIs, save fixtures
+#   python replay_server.py replay                  # serve saved fixtures only
+#   python replay_server.py replay --synthesize     # ...and generate data for anything unrecorded
+#   python replay_server.py replay --latency 0.2 --jitter 0.1 --error-rate 0.05 --throttle 20
+#
+# Point the fetchers at it through the environment:
+#
+#   FRED_BASE_URL=http://127.0.0.1:8765/fred/fred/series/observations
+#   EODHD_BASE_URL=http://127.0.0.1:8765/eodhd/api/eod
+#   YAHOO_CHART_URL=http://127.0.0.1:8765/yahoo/v8/finance/chart
+#
+# Fixtures are one JSON file per request under FIXTURE_DIR/<provider>/, keyed
+# by path + query (API keys stripped), so recordings can be shared safely.
+import argparse, hashlib, json, random, threading, time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import requests
+
+HOST = "127.0.0.1"
+PORT = 8765
+FIXTURE_DIR = Path("fixtures")
+
+# /<provider>/<rest> on this server maps to UPSTREAMS[provider]/<rest>
+UPSTREAMS = {
+    "fred":  "https://api.stlouisfed.org",
+    "eodhd": "https://eodhd.com",
+    "yahoo": "https://query1.finance.yahoo.com",
+}
+
+# query params never written to fixtures or used in fixture keys
+SECRET_PARAMS = {"api_key", "api_token"}
+
+UPSTREAM_HEADERS = {"User-Agent": "Mozilla/5.0 (MarketJournal recorder)"}
+
+# ====== Fixtures ======
+def fixture_key(provider: str, path: str, params: dict) -> str:
+    query = sorted((k, v) for k, v in params.items() if k not in SECRET_PARAMS)
+    raw = json.dumps([provider, path, query])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def fixture_path(provider: str, path: str, params: dict) -> Path:
+    return FIXTURE_DIR / provider / f"{fixture_key(provider, path, params)}.json"
+
+def load_fixture(provider, path, params):
+    try:
+        with open(fixture_path(provider, path, params)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_fixture(provider, path, params, status: int, body):
+    p = fixture_path(provider, path, params)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    clean = {k: v for k, v in params.items() if k not in SECRET_PARAMS}
+    tmp = p.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"path": path, "params": clean, "status": status, "body": body}, f)
+    tmp.replace(p)
+
+# ====== Synthetic responses ======
+def _walk(seed_text: str, n: int, start: float, step: float):
+    rng = random.Random(seed_text)
+    v, out = start, []
+    for _ in range(n):
+        v = max(0.01, v * (1 + rng.gauss(0, step)))
+        out.append(round(v, 4))
+    return out
+
+def _days(start: str, end: str, weekdays_only=True):
+    d0 = date.fromisoformat(start) if start else date.today() - timedelta(days=365)
+    d1 = date.fromisoformat(end) if end else date.today()
+    out, d = [], d0
+    while d <= d1:
+        if not weekdays_only or d.weekday() < 5:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+def synth_fred(path, params):
+    days = _days(params.get("observation_start"), params.get("observation_end"))
+    vals = _walk(params.get("series_id", ""), len(days), 3.0, 0.01)
+    return {"observations": [{"date": d.isoformat(), "value": f"{v:.2f}"} for d, v in zip(days, vals)]}
+
+def synth_eodhd(path, params):
+    days = _days(params.get("from"), params.get("to"))
+    vals = _walk(path, len(days), 2.5, 0.01)
+    return [{"date": d.isoformat(), "close": v} for d, v in zip(days, vals)]
+
+# seconds per bar for the chart endpoint's intraday intervals
+INTRADAY_STEP = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+                 "60m": 3600, "90m": 5400, "1h": 3600}
+
+def synth_yahoo(path, params):
+    symbol = path.rstrip("/").rsplit("/", 1)[-1]
+    start = datetime.fromtimestamp(int(params.get("period1", 0)), timezone.utc).date()
+    end = datetime.fromtimestamp(int(params.get("period2", time.time())), timezone.utc).date()
+    days = _days(start.isoformat(), (end - timedelta(days=1)).isoformat(),
+                 weekdays_only=not symbol.endswith("-USD"))
+    step = INTRADAY_STEP.get(params.get("interval", "1d"))
+    stamps = []
+    for d in days:
+        t0 = int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp())
+        stamps += list(range(t0, t0 + 86400, step)) if step else [t0]
+    closes = _walk(symbol, len(stamps), 100.0, 0.001 if step else 0.01)
+    return {"chart": {"result": [{
+        "meta": {"symbol": symbol, "gmtoffset": 0},
+        "timestamp": stamps,
+        "indicators": {"quote": [{
+            "open": closes, "high": [round(c * 1.0005, 4) for c in closes],
+            "low": [round(c * 0.9995, 4) for c in closes], "close": closes,
+            "volume": [1000] * len(closes),
+        }]},
+    }], "error": None}}
+
+SYNTHESIZERS = {"fred": synth_fred, "eodhd": synth_eodhd, "yahoo": synth_yahoo}
+
+# ====== Fault injection ======
+class Faults:
+    """Latency, random errors and a requests-per-second throttle (429 past it)."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle=0.0, seed=0):
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.throttle = error_rate, throttle
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = []  # arrival times in the last second
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def fail(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+    def throttled(self) -> bool:
+        if not self.throttle:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 1.0]
+            if len(self.window) >= self.throttle:
+                return True
+            self.window.append(now)
+            return False
+
+# ====== Server ======
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Mode, faults and counters live on the server (see make_server)."""
+
+    def _send(self, status: int, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _count(self, key):
+        with self.server.lock:
+            self.server.counters[key] = self.server.counters.get(key, 0) + 1
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        provider, _, rest = parts.path.lstrip("/").partition("/")
+        path = "/" + unquote(rest)
+        params = dict(parse_qsl(parts.query))
+        faults = self.server.faults
+
+        if provider == "_stats":
+            return self._send(200, self.server.counters)
+        if provider not in UPSTREAMS:
+            return self._send(404, {"error": f"unknown provider {provider!r}"})
+
+        if faults.throttled():
+            self._count("throttled")
+            return self._send(429, {"error": "throttled"}, {"Retry-After": "1"})
+        time.sleep(faults.delay())
+        if faults.fail():
+            self._count("errors")
+            return self._send(500, {"error": "injected failure"})
+
+        if self.server.mode == "record":
+            try:
+                resp = requests.get(UPSTREAMS[provider] + path, params=params,
+                                    headers=UPSTREAM_HEADERS, timeout=30)
+                body = resp.json()
+            except (requests.RequestException, ValueError) as e:
+                self._count("upstream_errors")
+                return self._send(502, {"error": f"upstream: {e}"})
+            save_fixture(provider, path, params, resp.status_code, body)
+            self._count("recorded")
+            return self._send(resp.status_code, body)
+
+        fx = load_fixture(provider, path, params)
+        if fx is not None:
+            self._count("replayed")
+            return self._send(fx["status"], fx["body"])
+        if self.server.synthesize:
+            self._count("synthesized")
+            return self._send(200, SYNTHESIZERS[provider](path, params))
+        self._count("missing")
+        clean = {k: v for k, v in params.items() if k not in SECRET_PARAMS}
+        return self._send(404, {"error": "no fixture", "path": path, "params": clean})
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            print(f"[{self.server.mode}] " + fmt % args)
+
+def make_server(mode="replay", host=HOST, port=PORT, synthesize=False, faults=None, verbose=False):
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.mode, server.synthesize, server.verbose = mode, synthesize, verbose
+    server.faults = faults or Faults()
+    server.counters, server.lock = {}, threading.Lock()
+    return server
+
+def serve_in_thread(**kwargs):
+    """Start a server on a daemon thread (for benchmarks); returns the server.
+    Use port=0 to pick a free port; server.server_address has the real one."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Record/replay stand-in for the market data providers.")
+    p.add_argument("mode", choices=["record", "replay"])
+    p.add_argument("--host", default=HOST)
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--fixtures", type=Path, default=FIXTURE_DIR)
+    p.add_argument("--synthesize", action="store_true",
+                   help="Replay: generate deterministic data for requests with no fixture.")
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    p.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency.")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500.")
+    p.add_argument("--throttle", type=float, default=0.0, help="Requests/second before answering 429.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("-v", "--verbose", action="store_true")
+    return p.parse_args()
+
+def main():
+    global FIXTURE_DIR
+    args = parse_args()
+    FIXTURE_DIR = args.fixtures
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.throttle, args.seed)
+    server = make_server(args.mode, args.host, args.port, args.synthesize, faults, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"[{args.mode}] serving on http://{host}:{port} (fixtures: {FIXTURE_DIR})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[done] {server.counters}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# The modules are flat scripts at the repo root; make them importable.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
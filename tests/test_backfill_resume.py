@@ -0,0 +1,77 @@
+# tests/test_backfill_resume.py
+# Resuming backfill_prices.run_chunks from a checkpoint, serially and on a
+# process pool.
+import json
+import threading
+
+import pytest
+
+from backfill_prices import run_chunks, _fetch_key, _merged_key
+from checkpoint import Checkpoint
+
+def fake_fetch(task):
+    """Stand-in for fetch_chunk (module level so the pool can pickle it)."""
+    ci, gi = task[:2]
+    return ci, gi, {f"d{ci}": {f"c{gi}": f"{ci}.{gi}"}}
+
+def _tasks(n_chunks, n_groups):
+    return [(ci, gi, None, None, None) for ci in range(n_chunks) for gi in range(n_groups)]
+
+def _expected(chunks, n_groups):
+    return [(ci, [fake_fetch((ci, gi))[2] for gi in range(n_groups)]) for ci in chunks]
+
+def _run(tasks, workers, window, ckpt, timeout=60):
+    """Drain run_chunks on a thread, so a hang fails the test instead of the run."""
+    out, errors = [], []
+    def target():
+        try:
+            out.extend(run_chunks(tasks, workers, window, ckpt, fetch=fake_fetch))
+        except Exception as e:
+            errors.append(e)
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), "run_chunks did not finish"
+    if errors:
+        raise errors[0]
+    return out
+
+def _fetched_keys(ckpt):
+    with open(ckpt.path) as f:
+        return [json.loads(line)["key"] for line in f if line.startswith('{"key":"fetch:')]
+
+def test_parallel_resume_with_later_chunks_restored(tmp_path):
+    # the restored groups of chunks 1-5 used to fill the window before chunk 0
+    # was submitted, and wait() on nothing spun forever
+    ckpt = Checkpoint("t", root=tmp_path)
+    for ci in range(1, 6):
+        ckpt.record(_fetch_key(ci, 0), fake_fetch((ci, 0))[2])
+    ckpt.close()
+    ckpt = Checkpoint("t", root=tmp_path)
+    assert _run(_tasks(7, 1), workers=2, window=4, ckpt=ckpt) == _expected(range(7), 1)
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_resume_skips_merged_and_fetches_only_missing(tmp_path, workers):
+    ckpt = Checkpoint("t", root=tmp_path)
+    ckpt.record(_merged_key(0))
+    for ci, gi in [(1, 0), (2, 1), (4, 2)]:
+        ckpt.record(_fetch_key(ci, gi), fake_fetch((ci, gi))[2])
+    ckpt.close()
+    ckpt = Checkpoint("t", root=tmp_path)
+    assert _run(_tasks(5, 3), workers=workers, window=2, ckpt=ckpt) == _expected(range(1, 5), 3)
+    fetched = _fetched_keys(ckpt)
+    assert len(fetched) == len(set(fetched)) == 12  # 3 restored + 9 new, none twice
+
+def test_checkpoint_reads_data_back_and_drops_torn_line(tmp_path):
+    ckpt = Checkpoint("t", {"a": 1}, root=tmp_path)
+    ckpt.record("x", {"cells": [1, 2]})
+    ckpt.record("y")
+    ckpt.close()
+    with open(ckpt.path, "a") as f:
+        f.write('{"key":"z","da')  # crash mid-write
+    resumed = Checkpoint("t", {"a": 1}, root=tmp_path)
+    assert "x" in resumed and "y" in resumed and "z" not in resumed
+    assert resumed.get("x") == {"cells": [1, 2]}
+    assert ckpt.path.read_bytes().endswith(b"\n")
+    resumed.finish()
+    assert not ckpt.path.exists()
@@ -0,0 +1,220 @@
+# trading_calendar.py
+# Per-exchange trading calendars (weekends + exchange holidays) so the
+# fetchers know the exact as-of session for a ticker on any date instead of
+# downloading a lookback window and searching it.
+#
+#   asof_session("JPX", date(2025, 9, 15))  -> date(2025, 9, 12)  # Respect for the Aged Day
+#
+# Holiday sets are computed from the rules below the first time a year is
+# looked up and memoized for the rest of the process (a few microseconds per
+# exchange-year, so there is nothing to precompute or persist).
+#   python trading_calendar.py JPX 2026    # list that year's holidays
+from datetime import date, timedelta
+from functools import lru_cache
+
+SAT, SUN = 5, 6
+MON, THU = 0, 3
+
+# ====== Date helpers ======
+def easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th weekday (MON=0..SUN=6) of the month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    nxt = date(year + month // 12, month % 12 + 1, 1)
+    last = nxt - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def us_observed(d: date) -> date:
+    """US rule: Saturday holiday -> Friday, Sunday holiday -> Monday."""
+    if d.weekday() == SAT:
+        return d - timedelta(days=1)
+    if d.weekday() == SUN:
+        return d + timedelta(days=1)
+    return d
+
+def substitute_forward(days) -> set:
+    """UK rule: a holiday on a weekend (or on a day already taken by an
+    earlier holiday) moves to the next free weekday."""
+    taken = set()
+    for d in sorted(days):
+        while d.weekday() >= SAT or d in taken:
+            d += timedelta(days=1)
+        taken.add(d)
+    return taken
+
+# ====== Exchange rules ======
+# one-off closures the rules can't express
+SPECIAL_CLOSURES = {
+    "NYSE": {date(2025, 1, 9)},  # national day of mourning (President Carter)
+    "LSE":  {date(2022, 6, 3), date(2022, 9, 19), date(2023, 5, 8)},
+    "JPX":  {date(2019, 4, 30), date(2019, 5, 1), date(2019, 5, 2), date(2019, 10, 22)},
+}
+# rule-based holidays that were moved in a given year
+MOVED_HOLIDAYS = {
+    "LSE": {date(2020, 5, 4): date(2020, 5, 8), date(2022, 5, 30): date(2022, 6, 2)},
+    "JPX": {
+        # Tokyo Olympics: Marine / Sports / Mountain Day moved
+        date(2020, 7, 20): date(2020, 7, 23), date(2020, 10, 12): date(2020, 7, 24),
+        date(2020, 8, 11): date(2020, 8, 10),
+        date(2021, 7, 19): date(2021, 7, 22), date(2021, 10, 11): date(2021, 7, 23),
+        date(2021, 8, 11): date(2021, 8, 8),
+    },
+}
+
+def _nyse(year: int) -> set:
+    days = {
+        nth_weekday(year, 1, MON, 3),        # Martin Luther King Jr. Day
+        nth_weekday(year, 2, MON, 3),        # Presidents' Day
+        easter(year) - timedelta(days=2),    # Good Friday
+        nth_weekday(year, 5, MON, -1),       # Memorial Day
+        us_observed(date(year, 7, 4)),       # Independence Day
+        nth_weekday(year, 9, MON, 1),        # Labor Day
+        nth_weekday(year, 11, THU, 4),       # Thanksgiving
+        us_observed(date(year, 12, 25)),     # Christmas
+    }
+    # New Year's Day on a Saturday is not made up on the Friday before
+    ny = date(year, 1, 1)
+    if ny.weekday() != SAT:
+        days.add(us_observed(ny))
+    if year >= 2022:
+        days.add(us_observed(date(year, 6, 19)))  # Juneteenth
+    return days
+
+def _lse(year: int) -> set:
+    e = easter(year)
+    moved = MOVED_HOLIDAYS["LSE"]
+    days = {moved.get(d, d) for d in (
+        e - timedelta(days=2),               # Good Friday
+        e + timedelta(days=1),               # Easter Monday
+        nth_weekday(year, 5, MON, 1),        # Early May bank holiday
+        nth_weekday(year, 5, MON, -1),       # Spring bank holiday
+        nth_weekday(year, 8, MON, -1),       # Summer bank holiday
+    )}
+    days |= substitute_forward([date(year, 1, 1)])
+    days |= substitute_forward([date(year, 12, 25), date(year, 12, 26)])
+    return days
+
+def _xetra(year: int) -> set:
+    e = easter(year)
+    return {
+        date(year, 1, 1),
+        e - timedelta(days=2),               # Good Friday
+        e + timedelta(days=1),               # Easter Monday
+        date(year, 5, 1),                    # Labour Day
+        date(year, 12, 24), date(year, 12, 25), date(year, 12, 26), date(year, 12, 31),
+    }
+
+def _equinoxes(year: int):
+    """(vernal, autumnal) equinox days in Japan (formula valid 1980-2099)."""
+    base = 0.242194 * (year - 1980) - (year - 1980) // 4
+    return date(year, 3, int(20.8431 + base)), date(year, 9, int(23.2488 + base))
+
+def _jpx(year: int) -> set:
+    vernal, autumnal = _equinoxes(year)
+    national = {
+        date(year, 1, 1),
+        nth_weekday(year, 1, MON, 2),        # Coming of Age Day
+        date(year, 2, 11),                   # National Foundation Day
+        vernal,
+        date(year, 4, 29),                   # Showa Day
+        date(year, 5, 3), date(year, 5, 4), date(year, 5, 5),  # Golden Week
+        nth_weekday(year, 7, MON, 3),        # Marine Day
+        nth_weekday(year, 9, MON, 3),        # Respect for the Aged Day
+        autumnal,
+        nth_weekday(year, 10, MON, 2),       # Sports Day
+        date(year, 11, 3),                   # Culture Day
+        date(year, 11, 23),                  # Labor Thanksgiving Day
+    }
+    if year >= 2016:
+        national.add(date(year, 8, 11))      # Mountain Day
+    if year >= 2020:
+        national.add(date(year, 2, 23))      # Emperor's Birthday
+    elif 1989 <= year <= 2018:
+        national.add(date(year, 12, 23))
+    moved = MOVED_HOLIDAYS["JPX"]
+    national = {moved.get(d, d) for d in national}
+
+    days = set(national)
+    # substitute holiday: a holiday on Sunday moves to the next non-holiday
+    for d in sorted(national):
+        if d.weekday() == SUN:
+            s = d + timedelta(days=1)
+            while s in days:
+                s += timedelta(days=1)
+            days.add(s)
+    # citizens' holiday: a weekday sandwiched between two holidays
+    for d in sorted(national):
+        gap = d + timedelta(days=1)
+        if gap not in days and gap + timedelta(days=1) in national and gap.weekday() < SAT:
+            days.add(gap)
+    # exchange closures: New Year (Jan 1-3) and Dec 31
+    days |= {date(year, 1, 2), date(year, 1, 3), date(year, 12, 31)}
+    return days
+
+def _futures(year: int) -> set:
+    """CME / ICE energy & metals: full closures only."""
+    return {date(year, 1, 1), easter(year) - timedelta(days=2), date(year, 12, 25)}
+
+HOLIDAY_RULES = {
+    "NYSE":  _nyse,
+    "LSE":   _lse,
+    "XETRA": _xetra,
+    "JPX":   _jpx,
+    "CME":   _futures,
+    "ICE":   _futures,
+    "FX":    lambda year: set(),
+    "CRYPTO": lambda year: set(),
+}
+
+# exchanges that trade every day of the week
+SEVEN_DAY = {"CRYPTO"}
+
+# ====== Lookups ======
+@lru_cache(maxsize=None)
+def holidays(exchange: str, year: int) -> frozenset:
+    """Holiday closure dates for exchange in year (weekends are handled by is_session)."""
+    days = set(HOLIDAY_RULES[exchange](year))
+    days |= {d for d in SPECIAL_CLOSURES.get(exchange, ()) if d.year == year}
+    return frozenset(d for d in days if d.year == year)
+
+def is_session(exchange: str, d: date) -> bool:
+    if exchange not in SEVEN_DAY and d.weekday() >= SAT:
+        return False
+    return d not in holidays(exchange, d.year)
+
+def asof_session(exchange: str, d: date) -> date:
+    """Latest trading session on or before d."""
+    while not is_session(exchange, d):
+        d -= timedelta(days=1)
+    return d
+
+def sessions(exchange: str, start: date, end: date) -> list:
+    """Trading sessions in [start, end]."""
+    out, d = [], start
+    while d <= end:
+        if is_session(exchange, d):
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+if __name__ == "__main__":
+    import sys
+    exchange = sys.argv[1] if len(sys.argv) > 1 else "NYSE"
+    year = int(sys.argv[2]) if len(sys.argv) > 2 else date.today().year
+    for d in sorted(holidays(exchange, year)):
+        print(d.isoformat(), d.strftime("%a"))
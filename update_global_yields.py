@@ -1,42 +1,43 @@
 import os
 import sys
-import requests
+import json
 import pandas as pd
 
+import instruments
+import providers
+
 EODHD_API_TOKEN = os.getenv("EODHD_API_TOKEN")
 if not EODHD_API_TOKEN:
     print("ERROR: EODHD_API_TOKEN not set in environment.")
     sys.exit(1)
 
-EODHD_BASE_URL = "https://eodhd.com/api/eod"
+EODHD_BASE_URL = os.getenv("EODHD_BASE_URL", "https://eodhd.com/api/eod")
 
-# EODHD Government Bond tickers (10Y gov bond, daily data)
-# See EODHD docs: DE10Y.GBOND, JP10Y.GBOND, UK10Y.GBOND
-GBOND_MAP = {
-    "GERMAN 10 YR (%)": "DE10Y.GBOND",  # Germany 10Y
-    "JAPAN 10 YR (%)":  "JP10Y.GBOND",  # Japan 10Y
-    "UK 10 YR (%)":     "UK10Y.GBOND",  # UK 10Y
-}
+# Per-symbol high-water mark: date of the newest bar already merged into
+# markets.csv. Each run only asks EODHD for bars after it.
+HWM_PATH = os.path.join("data", "markets_hwm.json")
 
+# EODHD Government Bond tickers (10Y gov bond, daily data), from the
+# instrument registry's "gbond" entries. See EODHD docs: DE10Y.GBOND, ...
+GBOND_MAP = instruments.gbond_symbols()
 
-def fetch_gbond_series(symbol: str, start_date: str, end_date: str) -> pd.Series:
-    """
-    Fetch daily 10Y government bond data from EODHD for the given symbol
-    and return it as a pandas Series indexed by date (Timestamp),
-    using the 'close' field as the yield/price.
-    """
+
+def gbond_request(symbol: str, start_date: str, end_date: str):
+    """(url, params) for one EODHD daily EOD request."""
     params = {
         "api_token": EODHD_API_TOKEN,
         "fmt": "json",
         "from": start_date,
         "to": end_date,
     }
+    return f"{EODHD_BASE_URL}/{symbol}", params
 
-    url = f"{EODHD_BASE_URL}/{symbol}"
-    resp = requests.get(url, params=params, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
 
+def parse_gbond_series(symbol: str, data, start_date: str, end_date: str) -> pd.Series:
+    """
+    Turn an EODHD daily response for the given symbol into a pandas Series
+    indexed by date (Timestamp), using the 'close' field as the yield/price.
+    """
     if not isinstance(data, list):
         print(f"Unexpected response for {symbol}: {data}")
         sys.exit(1)
@@ -61,6 +62,43 @@ def fetch_gbond_series(symbol: str, start_date: str, end_date: str) -> pd.Series
     return s.sort_index()
 
 
+def fetch_gbond_series(symbol: str, start_date: str, end_date: str) -> pd.Series:
+    """
+    Fetch daily 10Y government bond data from EODHD for the given symbol
+    and return it as a pandas Series indexed by date (Timestamp),
+    using the 'close' field as the yield/price.
+    """
+    url, params = gbond_request(symbol, start_date, end_date)
+    return parse_gbond_series(symbol, providers.get_json(url, params), start_date, end_date)
+
+
+def fetch_gbond_all(ranges) -> dict:
+    """{symbol: Series} for every (symbol, start_date, end_date), all requests in flight at once."""
+    ranges = list(ranges)
+    results = providers.fetch_all_json(gbond_request(*r) for r in ranges)
+    out = {}
+    for (symbol, start_date, end_date), data in zip(ranges, results):
+        if isinstance(data, Exception):
+            raise data
+        out[symbol] = parse_gbond_series(symbol, data, start_date, end_date)
+    return out
+
+
+def load_hwm() -> dict:
+    try:
+        with open(HWM_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hwm(hwm: dict):
+    tmp = HWM_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(hwm, f, indent=2, sort_keys=True)
+    os.replace(tmp, HWM_PATH)
+
+
 def main():
     # --- Load markets.csv ----------------------------------------------------
     csv_path = os.path.join("data", "markets.csv")
@@ -92,29 +130,58 @@ def main():
     df[date_col] = pd.to_datetime(df[date_col])
     df = df.sort_values(date_col)
 
-    start_date = df[date_col].min().strftime("%Y-%m-%d")
+    first_date = df[date_col].min()
     end_date = df[date_col].max().strftime("%Y-%m-%d")
-    print(f"Fetching bond data from {start_date} to {end_date}.")
 
-    # --- Fetch and align daily 10Y yields -----------------------------------
+    # --- Work out each symbol's delta past its high-water mark -------------
+    hwm = load_hwm()
+    ranges = []
     for col_name, symbol in GBOND_MAP.items():
-        print(f"Fetching {col_name} from EODHD ({symbol})...")
-        s = fetch_gbond_series(symbol, start_date, end_date)
+        mark = hwm.get(symbol) if col_name in df.columns else None
+        if mark is None:
+            start_date = first_date.strftime("%Y-%m-%d")  # first run: full history
+        else:
+            start_date = (pd.Timestamp(mark) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        if start_date > end_date:
+            print(f"{symbol} up to date (high-water mark {mark}).")
+            continue
+        print(f"Fetching {symbol} from {start_date} to {end_date}.")
+        ranges.append((symbol, start_date, end_date))
 
-        if s.empty:
+    # --- Fetch deltas (concurrently) and merge them into the frame ---------
+    series = fetch_gbond_all(ranges)
+    for col_name, symbol in GBOND_MAP.items():
+        if symbol not in series:
+            continue
+        s = series[symbol]
+        start = pd.Timestamp(next(r[1] for r in ranges if r[0] == symbol))
+
+        # Only rows at/after the delta start are touched; reindex the delta to
+        # those dates and forward-fill across weekends/holidays, seeded with the
+        # value already held at the high-water mark.
+        mask = (df[date_col] >= start).to_numpy()
+        if col_name in df.columns:
+            prior = df.loc[~mask, col_name].dropna()
+            seed = prior.iloc[-1] if len(prior) else None
+        else:
+            seed = None
+        if s.empty and seed is None:
             print(f"WARNING: No data for {symbol}, leaving {col_name} unchanged.")
             continue
-
-        # Reindex to the CSV's dates and forward-fill across weekends/holidays
-        aligned = (
-            s.reindex(df[date_col])
-             .ffill()
-        )
-
-        df[col_name] = aligned.values
+        if col_name not in df.columns:
+            df[col_name] = float("nan")
+        aligned = s.reindex(df.loc[mask, date_col]).ffill()
+        if seed is not None:
+            aligned = aligned.fillna(seed)
+        df.loc[mask, col_name] = aligned.values
+        if s.empty:
+            print(f"No new data for {symbol}, carried {col_name} forward.")
+        else:
+            hwm[symbol] = s.index.max().strftime("%Y-%m-%d")
 
     # --- Save back to CSV ----------------------------------------------------
     df.to_csv(csv_path, index=False)
+    save_hwm(hwm)
     print(f"Updated {csv_path} with DAILY global 10Y yields and removed empty rows.")
 
 
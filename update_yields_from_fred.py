@@ -1,11 +1,18 @@
 # update_yields_from_fred.py
 # Update JAPAN, GERMAN, UK 10 YR (%) values with actual FRED data for all dates after 2025-09-17
-import os, csv
+#
+# Fetched series and written row chunks are recorded in a checkpoint journal
+# (checkpoint.py); re-running after a crash reuses them instead of refetching.
+#   python update_yields_from_fred.py [--restart]
+import os
 from datetime import datetime, timedelta, date
-from pathlib import Path
-import requests
 import urllib3
 
+import fred_cache
+import instruments
+import journal
+from checkpoint import Checkpoint
+
 # Disable SSL warnings (we're using verify=False as workaround for certificate issues)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -14,70 +21,42 @@ if not FRED_KEY:
     print("[error] FRED_API_KEY not set")
     exit(1)
 
-FRED_BASE_URL = "https://api.stlouisfed.org/fred/series/observations"
-
-CSV_PATH = Path("data/etf_prices_log.csv")
+CSV_PATH = journal.CSV_PATH
 
-FRED_SERIES = {
-    "GERMAN 10 YR (%)": "IRLTLT01DEM156N",
-    "UK 10 YR (%)":     "IRLTLT01GBM156N",
-    "JAPAN 10 YR (%)":  "IRLTLT01JPM156N",
-}
+# FRED-sourced yield columns from the instrument registry
+FRED_SERIES = instruments.fred_series(primary_only=True)
 
 TARGET_COLS = list(FRED_SERIES.keys())
 
 def iso(s: str) -> date:
     return datetime.strptime(s.strip(), "%Y-%m-%d").date()
 
-def fred_latest_leq(series_id: str, d: date):
-    """Most recent FRED value on/before d (handles monthly series). Returns float or None."""
-    try:
-        # Look back further to ensure we get the latest monthly value
-        start_date = (d - timedelta(days=180)).strftime("%Y-%m-%d")
-        end_date = d.strftime("%Y-%m-%d")
-        
-        params = {
-            "series_id": series_id,
-            "api_key": FRED_KEY,
-            "file_type": "json",
-            "observation_start": start_date,
-            "observation_end": end_date,
-        }
-        
-        resp = requests.get(FRED_BASE_URL, params=params, timeout=30, verify=False)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        if "observations" not in data:
-            return None
-            
-        # Get the most recent non-empty value
-        values = []
-        for obs in data["observations"]:
-            val = obs.get("value", ".")
-            if val != "." and val is not None:
-                try:
-                    values.append((obs["date"], float(val)))
-                except (ValueError, TypeError):
-                    continue
-        
-        if values:
-            # Return the last value (most recent)
-            return values[-1][1]
-    except Exception as e:
-        print(f"[warn] FRED lookup failed for {series_id} on {d}: {e}")
-    return None
-
-def main():
-    if not CSV_PATH.exists():
+# Oldest FRED observation still accepted for a row (covers monthly series)
+LOOKBACK_DAYS = 180
+
+# Rows written (and checkpointed) per chunk
+CHUNK_ROWS = 250
+
+def load_series(start: date, end: date, ckpt: Checkpoint) -> dict:
+    """Fetch every FRED_SERIES once (concurrently) for [start - LOOKBACK_DAYS, end]
+    -> {col: SeriesIndex}. Series already in the checkpoint are not refetched."""
+    by_id = fred_cache.SeriesIndex.fetch_many(
+        FRED_SERIES.values(), start - timedelta(days=LOOKBACK_DAYS), end, verify=False, ckpt=ckpt
+    )
+    indexes = {}
+    for col, series_id in FRED_SERIES.items():
+        indexes[col] = by_id[series_id]
+        print(f"[info] {col} ({series_id}): {len(indexes[col])} observations")
+    return indexes
+
+def main(resume: bool = True):
+    if not journal.files():
         print(f"[error] CSV not found: {CSV_PATH}")
         return
 
     # Load all rows
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames
-        rows = list(reader)
+    headers = journal.read_header()
+    rows = journal.load_rows()
 
     if not headers:
         print("[error] No headers found")
@@ -86,21 +65,57 @@ def main():
     # Find cutoff date (2025-09-17)
     cutoff_date = iso("2025-09-17")
 
-    # Update all dates after cutoff with actual FRED data
+    # One request per series covering every row after the cutoff
+    dates = []
+    for row in rows:
+        try:
+            d = iso(row.get("date", ""))
+        except ValueError:
+            continue
+        if d > cutoff_date:
+            dates.append(d)
+    if not dates:
+        print("[info] No rows after cutoff")
+        return
+    params = {"cutoff": cutoff_date, "series": FRED_SERIES, "start": min(dates), "end": max(dates)}
+    with Checkpoint("update_yields_from_fred", params, resume=resume) as ckpt:
+        series = load_series(min(dates), max(dates), ckpt)
+
+        # Update all dates after cutoff with actual FRED data, one chunk of
+        # rows at a time (each chunk written and checkpointed before the next)
+        targets = sorted((r for r in rows if (r.get("date") or "").strip() > cutoff_date.isoformat()),
+                         key=lambda r: r["date"])
+        changed = 0
+        for i in range(0, len(targets), CHUNK_ROWS):
+            chunk = targets[i:i + CHUNK_ROWS]
+            key = f"rows:{chunk[0]['date']}..{chunk[-1]['date']}"
+            if key in ckpt:
+                changed += ckpt.get(key) or 0
+                continue
+            n = update_rows(chunk, series)
+            if n:
+                journal.upsert_rows(headers, chunk)
+            ckpt.record(key, n)
+            changed += n
+
+    if changed == 0:
+        print("[info] No changes needed (all values already match FRED data)")
+        return
+
+    print(f"[done] Updated CSV with {changed} values from FRED")
+    print(f"[cache] FRED {fred_cache.summary()}")
+
+def update_rows(rows, series) -> int:
+    """Set each target column to its FRED value in place; returns cells changed."""
     changed = 0
     for row in rows:
         dstr = row.get("date", "").strip()
-        if not dstr:
-            continue
         try:
             d = iso(dstr)
-            if d <= cutoff_date:
-                continue  # Skip dates on/before cutoff
 
             # Update each target column with FRED data
             for col in TARGET_COLS:
-                series_id = FRED_SERIES[col]
-                fred_val = fred_latest_leq(series_id, d)
+                fred_val = series[col].latest_leq(d, max_age_days=LOOKBACK_DAYS)
                 
                 if fred_val is not None:
                     old_val = row.get(col, "").strip()
@@ -114,19 +129,11 @@ def main():
         except Exception as e:
             print(f"[error] Processing row {dstr}: {e}")
             continue
-
-    if changed == 0:
-        print("[info] No changes needed (all values already match FRED data)")
-        return
-
-    # Write back
-    with open(CSV_PATH, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    print(f"[done] Updated CSV with {changed} values from FRED")
+    return changed
 
 if __name__ == "__main__":
-    main()
+    import instrumentation
+    import sys
+    with instrumentation.session("update_yields_from_fred"):
+        main(resume="--restart" not in sys.argv[1:])
 
@@ -0,0 +1,152 @@
+# validation.py
+# Declarative checks on journal cells, run before the journal is written.
+#
+# Rules come from the instrument registry: each entry's "checks" block
+# overrides the defaults for its kind, and precision is the entry's own.
+#
+#   range      [lo, hi]  value bounds (null = open); prices must also be > 0
+#   max_jump   largest day-over-day move vs the previous valid value:
+#              a fraction for prices (0.25 = 25%), percentage points for yields
+#   nullable   whether an empty cell is allowed
+#   precision  most decimals a cell may carry
+#
+# Every column is checked as a whole (numpy / pandas array ops; only cells
+# that fail to parse are looked at one by one), so the cost is a few array
+# passes however many rows there are. journal.write_rows() and
+# journal.upsert_row() call check() on the journal; JOURNAL_VALIDATE picks
+# what happens to violations: "warn" (default, print and write anyway),
+# "strict" (raise ValidationError, nothing is written) or "off".
+#
+#   python validation.py            # check the whole journal, exit 1 on violations
+import os
+import numpy as np
+import pandas as pd
+
+import instruments
+
+MODE = os.getenv("JOURNAL_VALIDATE", "warn")
+MAX_PRINTED = 20
+
+KIND_DEFAULTS = {
+    "price": {"range": [0.0, None], "max_jump": 0.25, "nullable": True},
+    "yield": {"range": [-5.0, 30.0], "max_jump": 1.0, "nullable": True},
+}
+
+class ValidationError(ValueError):
+    def __init__(self, violations):
+        self.violations = violations
+        super().__init__(f"{len(violations)} journal validation violation(s)")
+
+def rules() -> dict:
+    """{column: {"kind", "range", "max_jump", "nullable", "precision"}}."""
+    out = {}
+    for inst in instruments.load():
+        out[inst["column"]] = {
+            "kind": inst["kind"],
+            **KIND_DEFAULTS[inst["kind"]],
+            **inst.get("checks", {}),
+            "precision": inst["precision"],
+        }
+    return out
+
+def _excess_decimals(v: pd.Series, dp: int) -> pd.Series:
+    """True where the value needs more than dp decimals (compared on the
+    number, so it stays an array op; float noise is tolerated)."""
+    scaled = v * 10.0 ** dp
+    off = (scaled - scaled.round()).abs()
+    return (off > np.maximum(1e-6, scaled.abs() * 1e-12)).fillna(False)
+
+def _check_column(col, s: pd.Series, dates: pd.Series, rule: dict, prev=None) -> list:
+    """Violations for one column; s holds the raw cells in date order and
+    prev is the last valid value before the first row (for the jump)."""
+    raw = s.to_numpy(dtype=object)
+    missing = pd.isna(raw) | (raw == "") | (raw == "nan")  # as journal.cell_value sees them
+    try:
+        v = np.where(missing, np.nan, raw).astype(np.float64)  # float() tolerates whitespace
+    except (TypeError, ValueError):
+        v = pd.to_numeric(pd.Series(np.where(missing, np.nan, raw)), errors="coerce").to_numpy(dtype=np.float64, copy=True)
+    v[~np.isfinite(v)] = np.nan
+    # cells that still did not parse: blank after strip is missing, anything else is bad
+    empty, bad = missing.copy(), np.zeros(len(raw), dtype=bool)
+    for i in np.flatnonzero(np.isnan(v) & ~missing):
+        text = str(raw[i]).strip()
+        if text == "" or text.lower() == "nan":
+            empty[i] = True
+        else:
+            bad[i] = True
+    v = pd.Series(v)
+    empty, bad_num = pd.Series(empty), pd.Series(bad)
+
+    found = []
+    def add(mask, name, detail):
+        for i in np.flatnonzero(mask.to_numpy()):
+            found.append({"column": col, "date": dates.iat[i], "value": raw[i],
+                          "rule": name, "detail": detail(i)})
+
+    add(bad_num, "number", lambda i: "not a number")
+    if not rule.get("nullable", True):
+        add(empty, "nullable", lambda i: "empty cell")
+
+    lo, hi = rule.get("range") or (None, None)
+    if lo is not None:
+        low = v <= lo if rule["kind"] == "price" and lo == 0 else v < lo
+        add(low.fillna(False), "range", lambda i: f"below {lo}")
+    if hi is not None:
+        add((v > hi).fillna(False), "range", lambda i: f"above {hi}")
+
+    if rule.get("precision") is not None:
+        dp = rule["precision"]
+        add(_excess_decimals(v, dp), "precision", lambda i: f"more than {dp} decimals")
+
+    if rule.get("max_jump") is not None:
+        # previous valid value for each row, seeded with prev
+        seeded = pd.concat([pd.Series([np.nan if prev is None else prev]), v], ignore_index=True)
+        before = seeded.ffill().shift(1).iloc[1:].reset_index(drop=True)
+        if rule["kind"] == "yield":
+            move = (v - before).abs()
+            fmt = lambda i: f"moved {move.iat[i]:.4f}pp from {before.iat[i]:g}"
+        else:
+            move = (v / before - 1.0).abs()
+            fmt = lambda i: f"moved {move.iat[i]:.1%} from {before.iat[i]:g}"
+        add((move > rule["max_jump"]).fillna(False), "max_jump", fmt)
+    return found
+
+def validate(headers, rows, prev: dict | None = None, rule_set: dict | None = None) -> list:
+    """All violations in rows (any order; checked in date order). prev is
+    {column: value} just before the first row, for the day-over-day check."""
+    rule_set = rule_set or rules()
+    prev = prev or {}
+    frame = pd.DataFrame.from_records(rows, columns=list(headers))
+    frame = frame[frame["date"].fillna("").astype(str).str.strip() != ""]
+    frame = frame.sort_values("date", kind="stable").reset_index(drop=True)
+    found = []
+    for col in headers[1:]:
+        if col in rule_set:
+            found += _check_column(col, frame[col], frame["date"], rule_set[col], prev.get(col))
+    return found
+
+def report(violations, tag="validate"):
+    for v in violations[:MAX_PRINTED]:
+        print(f"[{tag}] {v['date']} {v['column']}: {v['rule']} - {v['detail']} ({v['value']!r})")
+    if len(violations) > MAX_PRINTED:
+        print(f"[{tag}] ... {len(violations) - MAX_PRINTED} more")
+
+def check(headers, rows, prev: dict | None = None, mode: str | None = None) -> list:
+    """validate() + act on the result according to mode (default JOURNAL_VALIDATE)."""
+    mode = mode or MODE
+    if mode == "off":
+        return []
+    violations = validate(headers, rows, prev)
+    if violations:
+        report(violations)
+        if mode == "strict":
+            raise ValidationError(violations)
+    return violations
+
+if __name__ == "__main__":
+    import sys
+    import journal
+    found = validate(journal.read_header(), journal.load_rows())
+    report(found)
+    print(f"[ok] no violations" if not found else f"[fail] {len(found)} violation(s)")
+    sys.exit(1 if found else 0)